@@ -1,16 +1,42 @@
 # main.py
 from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+import asyncio
+import contextlib
 import subprocess
 import os
 import time
 import tempfile
 import shutil
 import logging
-from typing import List, Optional
+from typing import List, Literal, Optional
 import json
+import threading
+import collections
+import hashlib
+import functools
+import re
+import codecs
+import sqlite3
+import uuid
+import base64
+import statistics
+import signal
+import socket
+import sys
 from fastapi.middleware.cors import CORSMiddleware
 
+# POSIX only: without them executions run as plain subprocesses, without memory/CPU limits or
+# resource usage, and venv templates are cloned without reflinks
+try:
+    import fcntl
+    import resource
+except ImportError:
+    fcntl = None
+    resource = None
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -33,42 +59,2182 @@ app.add_middleware(
 BASE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "environments")
 os.makedirs(BASE_DIR, exist_ok=True)
 
+# How often cached assignment metadata is checked against metadata.json for changes made outside the API
+ASSIGNMENT_CHECK_INTERVAL_SECONDS = float(os.environ.get("ASSIGNMENT_CHECK_INTERVAL_SECONDS", "2"))
+
+# Durable server state (job queue) that must survive restarts
+STATE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "state")
+os.makedirs(STATE_DIR, exist_ok=True)
+JOBS_DB_PATH = os.path.join(STATE_DIR, "jobs.db")
+
+# Searchable index of all assignments; last_used is written at most once per resolution per assignment
+CATALOG_DB_PATH = os.path.join(STATE_DIR, "catalog.db")
+CATALOG_LAST_USED_RESOLUTION_SECONDS = 60
+CATALOG_PAGE_SIZE = 100
+CATALOG_MAX_PAGE_SIZE = 1000
+
+# Registered test cases, one JSON file per assignment; kept when an environment is recreated
+TEST_CASES_DIR = os.path.join(STATE_DIR, "testcases")
+os.makedirs(TEST_CASES_DIR, exist_ok=True)
+
+# Background workers draining the job queue, and how long finished jobs are kept
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", "4"))
+JOB_RETENTION_SECONDS = int(os.environ.get("JOB_RETENTION_SECONDS", str(7 * 24 * 3600)))
+JOB_MAX_WAIT_SECONDS = 60
+
+# Number of pre-started interpreters kept waiting per Python assignment (0 disables the pool)
+PYTHON_POOL_SIZE = int(os.environ.get("PYTHON_POOL_SIZE", "2"))
+# Pools unused for this long are shut down, and beyond MAX_PYTHON_POOLS the least recently used goes
+PYTHON_POOL_IDLE_SECONDS = float(os.environ.get("PYTHON_POOL_IDLE_SECONDS", "600"))
+MAX_PYTHON_POOLS = int(os.environ.get("MAX_PYTHON_POOLS", "32"))
+# How often idle pools are looked for
+POOL_SWEEP_INTERVAL_SECONDS = 30
+
+# Script run by pooled and cold interpreters: wait for a length-prefixed submission
+# on stdin, then execute it as __main__ (the rest of stdin stays available to it),
+# so submissions never have to be written to disk
+PYTHON_POOL_BOOTSTRAP = """
+import sys
+# -c puts the working directory, the server's, first on sys.path: never import from there
+if sys.path and sys.path[0] == "":
+    del sys.path[0]
+import types, linecache, traceback
+_size = int(sys.stdin.buffer.readline())
+_source = sys.stdin.buffer.read(_size).decode("utf-8")
+linecache.cache["main.py"] = (len(_source), None, _source.splitlines(True), "main.py")
+_main = types.ModuleType("__main__")
+_main.__file__ = "main.py"
+sys.modules["__main__"] = _main
+sys.argv = ["main.py"]
+try:
+    exec(compile(_source, "main.py", "exec"), _main.__dict__)
+except SystemExit:
+    raise
+except BaseException as _e:
+    traceback.print_exception(type(_e), _e, _e.__traceback__.tb_next)
+    sys.exit(1)
+"""
+
+# The same for Node.js processes started without the worker host: the submission runs as
+# main.js of the current directory. fd 0 is read exactly, leaving the rest for process.stdin
+NODE_STDIN_BOOTSTRAP = """
+const fs = require('fs');
+const path = require('path');
+const Module = require('module');
+const readExactly = (size) => {
+  const buffer = Buffer.alloc(size);
+  let offset = 0;
+  while (offset < size) {
+    let count;
+    try {
+      count = fs.readSync(0, buffer, offset, size - offset, null);
+    } catch (err) {
+      if (err.code === 'EAGAIN') continue;
+      throw err;
+    }
+    if (count === 0) break;
+    offset += count;
+  }
+  return buffer.subarray(0, offset);
+};
+let header = '';
+for (let byte = readExactly(1); byte.length && byte[0] !== 10; byte = readExactly(1)) {
+  header += String.fromCharCode(byte[0]);
+}
+const source = readExactly(parseInt(header, 10)).toString('utf8');
+const filename = path.join(process.cwd(), 'main.js');
+const mod = new Module(filename, null);
+mod.filename = filename;
+mod.paths = Module._nodeModulePaths(process.cwd());
+process.mainModule = mod;
+process.argv[1] = filename;
+mod._compile(source, filename);
+"""
+
+# Put ahead of the bootstrap when interpreters start without site processing: add the venv's
+# site-packages and the exit/quit/help builtins that site.py would otherwise provide
+PYTHON_FAST_START_PRELUDE = """
+import sys, builtins, _sitebuiltins
+sys.path.extend({site_packages!r})
+builtins.exit = _sitebuiltins.Quitter("exit", "Ctrl-D (i.e. EOF)")
+builtins.quit = _sitebuiltins.Quitter("quit", "Ctrl-D (i.e. EOF)")
+builtins.help = _sitebuiltins._Helper()
+"""
+
+# Interpreter starts timed per profile when a Python environment is created
+PYTHON_STARTUP_BENCHMARK_RUNS = 5
+
+def source_payload(code, stdin):
+    """stdin for a bootstrapped interpreter: the length-prefixed source followed by the program's own input"""
+    source = code.encode("utf-8")
+    return f"{len(source)}\n".encode("utf-8") + source + stdin.encode("utf-8")
+
+# Helper that forks executions from a small process and reports their rusage. Requests
+# (JSON plus the child's stdin/stdout/stderr fds) arrive on a SOCK_SEQPACKET socket; it
+# answers {"id", "pid"} once started and {"id", "returncode", "rusage"} once reaped.
+# Its own forks would still carry its Python heap into ru_maxrss, so each execution is
+# forked by /bin/sh instead, which exits right away and leaves it to the spawner as the
+# subreaper. The shell gets the execution's stdin on fd 4 and writes its pid to fd 3
+PROCESS_SPAWNER_SCRIPT = """
+import ctypes, fcntl, json, os, resource, selectors, signal, socket, sys
+TRAMPOLINE = ["/bin/sh", "-c", 'exec 4<&0; "$@" <&4 4<&- 3>&- & exec printf %s $! >&3', "sh"]
+PR_SET_CHILD_SUBREAPER = 36
+try:
+    subreaper = ctypes.CDLL(None, use_errno=True).prctl(PR_SET_CHILD_SUBREAPER, 1, 0, 0, 0) == 0
+except (AttributeError, OSError):
+    subreaper = False
+sock = socket.socket(fileno=int(sys.argv[1]))
+wakeup_read, wakeup_write = os.pipe()
+os.set_blocking(wakeup_write, False)
+signal.set_wakeup_fd(wakeup_write)
+signal.signal(signal.SIGCHLD, lambda *args: None)
+children = {}
+
+def send(message):
+    sock.send(json.dumps(message).encode("utf-8"))
+
+def spawn(request, fds):
+    for fd in fds:
+        os.set_inheritable(fd, False)
+    pid_read, pid_write = os.pipe() if subreaper else (None, None)
+    try:
+        pid = os.fork()
+    except OSError as e:
+        for fd in fds + [pid_read, pid_write]:
+            if fd is not None:
+                os.close(fd)
+        send({"id": request["id"], "error": str(e)})
+        return
+    if pid == 0:
+        try:
+            if subreaper:
+                os.close(pid_read)
+                fds = fds + [pid_write]
+            # Out of the way of the low numbers they are moved to
+            fds = [fcntl.fcntl(fd, fcntl.F_DUPFD_CLOEXEC, 10) for fd in fds]
+            for target, fd in enumerate(fds):
+                os.dup2(fd, target)
+            if request["cwd"]:
+                os.chdir(request["cwd"])
+            if request["memory_mb"]:
+                memory = request["memory_mb"] * 1024 * 1024
+                resource.setrlimit(resource.RLIMIT_DATA, (memory, memory))
+            if request["cpu_seconds"]:
+                # SIGXCPU at the soft limit, SIGKILL a second later if it is ignored
+                resource.setrlimit(resource.RLIMIT_CPU, (request["cpu_seconds"], request["cpu_seconds"] + 1))
+            signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+            if subreaper:
+                os.execve(TRAMPOLINE[0], TRAMPOLINE + request["args"], request["env"])
+            os.execvpe(request["args"][0], request["args"], request["env"])
+        except BaseException as e:
+            os.write(2, f"Could not start {request['args'][0]}: {e}\\n".encode("utf-8"))
+        finally:
+            os._exit(127)
+    for fd in fds:
+        os.close(fd)
+    if subreaper:
+        # The shell is reaped like the orphans of executions, only the execution's own pid is reported
+        os.close(pid_write)
+        output = b""
+        while data := os.read(pid_read, 64):
+            output += data
+        os.close(pid_read)
+        if not output.isdigit():
+            send({"id": request["id"], "error": f"Could not start {request['args'][0]} through /bin/sh"})
+            return
+        pid = int(output)
+    children[pid] = request["id"]
+    send({"id": request["id"], "pid": pid})
+
+def reap():
+    while True:
+        try:
+            pid, status, rusage = os.wait4(-1, os.WNOHANG)
+        except ChildProcessError:
+            return
+        if pid == 0:
+            return
+        if pid in children:
+            send({"id": children.pop(pid), "returncode": os.waitstatus_to_exitcode(status), "rusage": list(rusage)})
+
+selector = selectors.DefaultSelector()
+selector.register(sock, selectors.EVENT_READ)
+selector.register(wakeup_read, selectors.EVENT_READ)
+while True:
+    for key, _ in selector.select():
+        if key.fileobj is sock:
+            message, fds, _, _ = socket.recv_fds(sock, 1 << 20, 3)
+            if not message:
+                sys.exit(0)
+            spawn(json.loads(message), fds)
+        else:
+            os.read(wakeup_read, 4096)
+            reap()
+"""
+
+# Number of pre-started worker threads kept by each JavaScript assignment's Node.js host (0 disables it)
+NODE_POOL_SIZE = int(os.environ.get("NODE_POOL_SIZE", "2"))
+# Hosts unused for this long are shut down, and beyond MAX_NODE_HOSTS the least recently used idle one goes
+NODE_HOST_IDLE_SECONDS = float(os.environ.get("NODE_HOST_IDLE_SECONDS", "600"))
+MAX_NODE_HOSTS = int(os.environ.get("MAX_NODE_HOSTS", "16"))
+NODE_WORKER_HOST = os.path.join(os.path.dirname(os.path.abspath(__file__)), "node_worker_host.cjs")
+
+# Read size for child process pipes; also the granularity of streamed output
+OUTPUT_CHUNK_SIZE = 64 * 1024
+
+# Output kept per stream: the first and last halves of this many bytes, with a marker for what was cut in between
+OUTPUT_CAPTURE_BYTES = int(os.environ.get("OUTPUT_CAPTURE_BYTES", str(64 * 1024)))
+
+# Default limits of each execution, overridable per assignment (0 disables a memory, CPU or output limit)
+# Running code is killed once it has written OUTPUT_LIMIT_BYTES to stdout and stderr combined
+COMPILE_TIMEOUT_SECONDS = float(os.environ.get("COMPILE_TIMEOUT_SECONDS", "30"))
+RUN_TIMEOUT_SECONDS = float(os.environ.get("RUN_TIMEOUT_SECONDS", "30"))
+COMPILE_MEMORY_LIMIT_MB = int(os.environ.get("COMPILE_MEMORY_LIMIT_MB", "2048"))
+MEMORY_LIMIT_MB = int(os.environ.get("MEMORY_LIMIT_MB", "1024"))
+CPU_TIME_LIMIT_SECONDS = int(os.environ.get("CPU_TIME_LIMIT_SECONDS", "30"))
+OUTPUT_LIMIT_BYTES = int(os.environ.get("OUTPUT_LIMIT_BYTES", str(16 * 1024 * 1024)))
+
+# Largest single message accepted from a Node.js worker host
+NODE_HOST_MESSAGE_LIMIT = 1 << 30
+
+# How many executions may compile/run at once, overall and per language
+MAX_CONCURRENT_EXECUTIONS = int(os.environ.get("MAX_CONCURRENT_EXECUTIONS", str(os.cpu_count() or 4)))
+LANGUAGE_CONCURRENCY = {
+    "python": int(os.environ.get("MAX_CONCURRENT_PYTHON", str(MAX_CONCURRENT_EXECUTIONS))),
+    "javascript": int(os.environ.get("MAX_CONCURRENT_JAVASCRIPT", str(MAX_CONCURRENT_EXECUTIONS))),
+    "cpp": int(os.environ.get("MAX_CONCURRENT_CPP", str(MAX_CONCURRENT_EXECUTIONS)))
+}
+
+# C++ compiler settings, part of the compile cache key
+CPP_COMPILER = "g++"
+CPP_FLAGS = ["-std=c++17"]
+
+# Standard headers precompiled once per compiler version and flags, shared by every C++ assignment
+CPP_PCH_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache", "pch")
+CPP_PCH_NAME = "stdcpp.h"
+CPP_PCH_HEADERS = [
+    "algorithm", "array", "atomic", "bitset", "cassert", "chrono", "climits", "cmath",
+    "condition_variable", "cstdio", "cstdlib", "cstring", "deque", "fstream", "functional",
+    "future", "iomanip", "iostream", "limits", "list", "map", "memory", "mutex", "numeric",
+    "queue", "random", "set", "sstream", "stack", "string", "thread", "tuple",
+    "unordered_map", "unordered_set", "utility", "vector"
+]
+CPP_INCLUDE_PATTERN = re.compile(r'#\s*include\s*([<"])([^>"]+)[>"]')
+
+# Compiled C++ binaries cached by source hash, compiler version and flags (0 bytes disables the cache)
+CPP_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache", "cpp")
+CPP_CACHE_MAX_BYTES = int(os.environ.get("CPP_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+
+# Wheels shared by every Python environment: requirements are installed from here offline and
+# only fetched from the package index (once, for all assignments) when the wheelhouse lacks them
+WHEELHOUSE_DIR = os.environ.get(
+    "WHEELHOUSE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache", "wheels")
+)
+
+# Python and JavaScript environments, stored once per (language, runtime version, requirements) and
+# linked into every assignment that needs them
+ENVIRONMENT_STORE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache", "environments")
+
+# Base venvs built once and cloned for new Python environments, so only the requirements a
+# template does not provide are installed. Templates named in VENV_TEMPLATES_PREBUILD are built at startup
+VENV_TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache", "templates")
+VENV_TEMPLATES = {
+    "bare": [],
+    "scientific": ["numpy", "pandas", "scipy", "matplotlib"],
+    "web": ["requests", "flask", "beautifulsoup4"]
+}
+VENV_TEMPLATES_PREBUILD = [name for name in os.environ.get("VENV_TEMPLATES_PREBUILD", "bare").split(",") if name]
+
+# Every file of installed node_modules trees stored once by content; environments hardlink into it
+# and a repeated install of the same packages only links the files it recorded
+NODE_STORE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache", "node-store")
+
+# Installer error messages naming the requirement that could not be resolved
+INSTALL_ERROR_PATTERNS = {
+    "python": [re.compile(r"No matching distribution found for (\S+)")],
+    "javascript": [
+        re.compile(r"No matching version found for (\S+?)\.?$", re.MULTILINE),
+        re.compile(r"'(\S+)' is not in this registry")
+    ]
+}
+
+# Results of deterministic programs reused for identical runs (0 entries or seconds disables the cache)
+# The optional on-disk layer keeps results across restarts (0 bytes disables it)
+RESULT_CACHE_SIZE = int(os.environ.get("RESULT_CACHE_SIZE", "1024"))
+RESULT_CACHE_TTL_SECONDS = float(os.environ.get("RESULT_CACHE_TTL_SECONDS", "3600"))
+RESULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache", "results")
+RESULT_CACHE_DISK_BYTES = int(os.environ.get("RESULT_CACHE_DISK_BYTES", "0"))
+
+# Code using any of these may behave differently from run to run and is never served from the result cache
+NONDETERMINISTIC_PATTERNS = {
+    "python": re.compile(
+        r"\b(random|secrets|uuid|time|datetime|os|socket|threading|multiprocessing|concurrent|asyncio|"
+        r"subprocess|requests|urllib|http|tempfile|glob|pathlib|shutil|signal|ctypes|importlib|__import__)\b"
+        r"|\b(open|hash|id|set|frozenset|eval|exec)\s*\("
+    ),
+    "javascript": re.compile(
+        r"Math\.random|\bDate\b|\bperformance\b|\bcrypto\b|process\.(hrtime|env|pid|memoryUsage|cpuUsage|uptime)"
+        r"|\bfetch\s*\(|\bimport\s*\(|require\s*\(\s*['\"`](node:)?"
+        r"(fs|child_process|http|https|net|dgram|dns|os|worker_threads|cluster|perf_hooks)\b"
+    ),
+    "cpp": re.compile(
+        r"\b(random_device|chrono|thread|async|getpid|getenv|fopen|fstream|ifstream|ofstream|sleep|usleep)\b"
+        r"|\b(time|clock|system)\s*\("
+    )
+}
+
 # Pydantic models for request validation
+class ExecutionLimits(BaseModel):
+    # None uses the server default of the same name in upper case (e.g. RUN_TIMEOUT_SECONDS)
+    compile_timeout: Optional[float] = Field(None, gt=0)  # Seconds, C++ only
+    run_timeout: Optional[float] = Field(None, gt=0)  # Seconds
+    compile_memory_mb: Optional[int] = Field(None, ge=0)  # Data segment cap of the compiler, C++ only
+    memory_mb: Optional[int] = Field(None, ge=0)  # Data segment cap of the running code
+    cpu_seconds: Optional[int] = Field(None, ge=0)  # CPU time cap of the running code
+    output_limit_bytes: Optional[int] = Field(None, ge=0)  # stdout + stderr written before the code is killed
+
 class AssignmentCreate(BaseModel):
     assignment_name: str
     language: str  # 'python', 'javascript', or 'cpp'
     requirements: List[str] = []
+    limits: ExecutionLimits = ExecutionLimits()
+    # Python only: start interpreters isolated (-I) and, where safe, without site processing (-S)
+    fast_start: bool = False
+
+class WheelhouseSeed(BaseModel):
+    requirements: List[str]  # pip requirement specifiers, e.g. 'numpy==1.26.4'
 
 class CodeExecution(BaseModel):
     assignment_name: str
     code: str
+    stdin: str = ""
+    stdin_cases: Optional[List[str]] = None  # Run the code once per input instead of once with stdin
 
 class ExecutionResult(BaseModel):
     output: str
     error: str
     execution_time: float
+    warm_start: bool = False  # True when served by a pre-started interpreter or worker
+    compile_cache: Optional[str] = None  # 'hit' or 'miss' for compiled languages
+    result_cache: Optional[str] = None  # 'hit' or 'miss' for programs whose results may be reused
+    compile_time_saved: float = 0.0  # Compile time skipped thanks to a cache hit
+    result_time_saved: float = 0.0  # Execution time of the original run when served from the result cache
+    output_truncated: bool = False  # True when only the head and tail of the output were kept
+    output_limit_exceeded: bool = False  # Killed for writing more than its output limit
+    cpu_time_user: Optional[float] = None  # CPU seconds spent in user mode
+    cpu_time_system: Optional[float] = None  # CPU seconds spent in the kernel
+    peak_memory_kb: Optional[int] = None  # Peak RSS (V8 heap for warm JavaScript runs)
+    exit_code: Optional[int] = None  # Exit status of the program, None if it never ran to completion
+    queue_time: float = 0.0  # Time spent waiting for an execution slot, not part of execution_time
+    timed_out: bool = False  # Stopped for exceeding its run timeout or CPU time limit
+    cases: Optional[List["ExecutionResult"]] = None  # One result per input when stdin_cases was given
+
+class BatchItem(BaseModel):
+    id: str
+    code: str
+    stdin: str = ""
+
+class BatchExecution(BaseModel):
+    assignment_name: str
+    items: List[BatchItem]
+
+class BatchItemResult(ExecutionResult):
+    id: str
+
+class JobSubmission(BaseModel):
+    assignment_name: str
+    code: str
+
+class TestCase(BaseModel):
+    name: Optional[str] = None
+    input: str = ""
+    expected_output: str
+    # 'exact', 'trim' (ignore trailing whitespace on lines and at the end) or 'tokens' (whitespace-separated)
+    comparison: Literal["exact", "trim", "tokens"] = "trim"
+    hidden: bool = False  # Grading reports only the verdict of hidden cases
+    weight: float = Field(1.0, ge=0)
+
+class TestCaseInfo(BaseModel):
+    name: str
+    hidden: bool
+    comparison: str
+    weight: float
+    # Left out for hidden cases
+    input: Optional[str] = None
+    expected_output: Optional[str] = None
+
+class TestCaseUpload(BaseModel):
+    assignment_name: str
+    test_cases: List[TestCase]
+
+class GradeSubmission(BaseModel):
+    assignment_name: str
+    code: str
+    # Compare stdout while it streams and stop each case at its first difference
+    stop_on_mismatch: bool = False
+
+class CaseVerdict(BaseModel):
+    name: str
+    hidden: bool
+    verdict: str  # 'pass', 'wrong_answer', 'timeout', 'output_limit_exceeded', 'runtime_error' or 'compile_error'
+    weight: float
+    execution_time: float
+    # Left out for hidden cases
+    mismatch_line: Optional[int] = None  # Where wrong output first differs from the expected output
+    mismatch_column: Optional[int] = None
+    input: Optional[str] = None
+    expected_output: Optional[str] = None
+    output: Optional[str] = None
+    error: Optional[str] = None
+
+class GradeResult(BaseModel):
+    assignment_name: str
+    score: float  # Total weight of the passed cases
+    max_score: float
+    passed: int
+    total: int
+    execution_time: float
+    compile_error: Optional[str] = None
+    cases: List[CaseVerdict]
+
+class JobStatus(BaseModel):
+    job_id: str
+    assignment_name: str
+    status: str  # 'queued', 'running', 'completed' or 'failed'
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    result: Optional[ExecutionResult] = None
+
+class JobStore:
+    """SQLite-backed execution queue; queued and finished jobs survive a restart"""
+
+    def __init__(self, db_path):
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                job_id TEXT PRIMARY KEY,
+                assignment_name TEXT NOT NULL,
+                code TEXT NOT NULL,
+                status TEXT NOT NULL,
+                result TEXT,
+                created_at REAL NOT NULL,
+                started_at REAL,
+                finished_at REAL
+            )
+        """)
+        self._db.execute("CREATE INDEX IF NOT EXISTS jobs_status_created ON jobs (status, created_at)")
+
+    def submit(self, assignment_name, code):
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO jobs (job_id, assignment_name, code, status, created_at) VALUES (?, ?, ?, 'queued', ?)",
+                (job_id, assignment_name, code, time.time())
+            )
+        return job_id
+
+    def claim_next(self):
+        """Mark the oldest queued job as running and return it, or None if the queue is empty"""
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._db.execute(
+                    "SELECT * FROM jobs WHERE status = 'queued' ORDER BY created_at LIMIT 1"
+                ).fetchone()
+                if row is not None:
+                    self._db.execute(
+                        "UPDATE jobs SET status = 'running', started_at = ? WHERE job_id = ?",
+                        (time.time(), row["job_id"])
+                    )
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+        return row
+
+    def finish(self, job_id, status, result):
+        with self._lock:
+            self._db.execute(
+                "UPDATE jobs SET status = ?, result = ?, finished_at = ? WHERE job_id = ?",
+                (status, json.dumps(result), time.time(), job_id)
+            )
+
+    def get(self, job_id):
+        with self._lock:
+            row = self._db.execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        
+        job = {key: row[key] for key in ("job_id", "assignment_name", "status", "created_at", "started_at", "finished_at")}
+        job["result"] = json.loads(row["result"]) if row["result"] else None
+        return job
+
+    def recover(self, retention_seconds):
+        """Requeue jobs interrupted by a restart and drop finished jobs past their retention"""
+        with self._lock:
+            self._db.execute("UPDATE jobs SET status = 'queued', started_at = NULL WHERE status = 'running'")
+            self._db.execute(
+                "DELETE FROM jobs WHERE status IN ('completed', 'failed') AND finished_at < ?",
+                (time.time() - retention_seconds,)
+            )
+
+job_store = JobStore(JOBS_DB_PATH)
+
+def requirement_name(requirement, language="python"):
+    """Package name of a pip or npm requirement, e.g. 'numpy' for 'NumPy>=1.26' or '@types/node' for '@types/node@20'.
+    
+    pip names are normalized as PyPI compares them; npm names are kept verbatim, since
+    'string_decoder' and 'string-decoder' or 'JSONStream' and 'jsonstream' are different packages.
+    """
+    requirement = requirement.strip()
+    if language == "javascript":
+        scope = "@" if requirement.startswith("@") else ""
+        return scope + requirement[len(scope):].split("@", 1)[0].strip()
+    if requirement.startswith("@"):
+        return "@" + re.split(r"@", requirement[1:], maxsplit=1)[0].lower()
+    return re.split(r"[<>=!~\[;@ ]", requirement, maxsplit=1)[0].lower().replace("_", "-")
+
+def normalize_requirement(requirement, language="python"):
+    """Requirement with its package name normalized, e.g. 'numpy>=1.26' for 'NumPy>=1.26'; npm requirements only lose surrounding whitespace"""
+    requirement = requirement.strip()
+    if language == "javascript":
+        return requirement
+    name = requirement_name(requirement)
+    # Normalizing keeps the name's length, so the rest of the requirement starts at the same offset
+    return name + requirement[len(name):]
+
+def directory_size(path):
+    """Bytes allocated on disk for a directory tree, counting hardlinked files once"""
+    total = 0
+    seen = set()
+    pending = [path]
+    while pending:
+        try:
+            with os.scandir(pending.pop()) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            pending.append(entry.path)
+                            continue
+                        stat = entry.stat(follow_symlinks=False)
+                    except OSError:
+                        continue
+                    if (stat.st_dev, stat.st_ino) not in seen:
+                        seen.add((stat.st_dev, stat.st_ino))
+                        total += stat.st_blocks * 512
+        except OSError:
+            continue
+    return total
+
+class AssignmentCatalog:
+    """SQLite index of assignments for filtered, sorted and cursor-paginated listings"""
+
+    # Sort keys accepted by query() and the columns they order by
+    SORT_COLUMNS = {"name": "name", "created_at": "created_at", "last_used": "last_used", "size": "size_bytes"}
+
+    def __init__(self, db_path, last_used_resolution):
+        self.last_used_resolution = last_used_resolution
+        self._touched = {}
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS assignments (
+                name TEXT PRIMARY KEY,
+                language TEXT NOT NULL,
+                requirements TEXT NOT NULL,
+                created_at TEXT NOT NULL,
+                size_bytes INTEGER NOT NULL DEFAULT 0,
+                last_used REAL NOT NULL DEFAULT 0
+            )
+        """)
+        # Package names of each assignment's requirements, for filtering by package
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS assignment_packages (
+                package TEXT NOT NULL,
+                name TEXT NOT NULL,
+                PRIMARY KEY (package, name)
+            )
+        """)
+        # Every sort key is paired with the name so keyset pagination stays on an index
+        self._db.execute("CREATE INDEX IF NOT EXISTS assignments_language ON assignments (language, name)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS assignments_created ON assignments (created_at, name)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS assignments_last_used ON assignments (last_used, name)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS assignments_size ON assignments (size_bytes, name)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS assignment_packages_name ON assignment_packages (name)")
+
+    def upsert(self, name, metadata, size_bytes):
+        """Add or refresh an assignment, keeping when it was last used"""
+        requirements = metadata.get("requirements") or []
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                self._db.execute(
+                    """
+                    INSERT INTO assignments (name, language, requirements, created_at, size_bytes)
+                    VALUES (?, ?, ?, ?, ?)
+                    ON CONFLICT (name) DO UPDATE SET
+                        language = excluded.language,
+                        requirements = excluded.requirements,
+                        created_at = excluded.created_at,
+                        size_bytes = excluded.size_bytes
+                    """,
+                    (
+                        name,
+                        metadata.get("language", "unknown"),
+                        json.dumps(requirements),
+                        metadata.get("created_at", "unknown"),
+                        size_bytes
+                    )
+                )
+                self._db.execute("DELETE FROM assignment_packages WHERE name = ?", (name,))
+                self._db.executemany(
+                    "INSERT OR IGNORE INTO assignment_packages (package, name) VALUES (?, ?)",
+                    [(requirement_name(requirement), name) for requirement in requirements]
+                )
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+
+    def remove(self, name):
+        with self._lock:
+            self._db.execute("DELETE FROM assignments WHERE name = ?", (name,))
+            self._db.execute("DELETE FROM assignment_packages WHERE name = ?", (name,))
+        self._touched.pop(name, None)
+
+    def update(self, name, entry):
+        """Mirror an assignment registry entry, measuring its size on disk including the shared environment it links to"""
+        if entry is None:
+            self.remove(name)
+            return
+        metadata = entry.metadata or {}
+        size_bytes = directory_size(entry.directory)
+        if metadata.get("shared_environment"):
+            size_bytes += environment_store.size(metadata["shared_environment"])
+        self.upsert(name, metadata, size_bytes)
+
+    def sync(self, entries):
+        """Bring the catalog in line with the registry's (name, entry) pairs, e.g. after changes while the server was down"""
+        with self._lock:
+            cataloged = {row["name"]: row["created_at"] for row in self._db.execute("SELECT name, created_at FROM assignments")}
+        
+        entries = dict(entries)
+        for name in cataloged.keys() - entries.keys():
+            self.remove(name)
+        for name, entry in entries.items():
+            if cataloged.get(name) != (entry.metadata or {}).get("created_at", "unknown"):
+                self.update(name, entry)
+
+    def touch(self, name):
+        """Record that an assignment was just used"""
+        now = time.time()
+        if now - self._touched.get(name, 0.0) < self.last_used_resolution:
+            return
+        self._touched[name] = now
+        with self._lock:
+            self._db.execute("UPDATE assignments SET last_used = ? WHERE name = ?", (now, name))
+
+    def query(self, language=None, prefix=None, package=None, created_after=None, created_before=None,
+              sort="name", descending=False, limit=CATALOG_PAGE_SIZE, cursor=None):
+        """Return (assignments, next_cursor) for one page; raises ValueError for a cursor of another listing"""
+        column = self.SORT_COLUMNS[sort]
+        clauses = []
+        params = []
+        if language:
+            clauses.append("language = ?")
+            params.append(language)
+        if prefix:
+            # A range on the primary key instead of LIKE, which could not use the index
+            clauses.append("name >= ? AND name < ?")
+            params += [prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1)]
+        if package:
+            clauses.append("name IN (SELECT name FROM assignment_packages WHERE package = ?)")
+            params.append(requirement_name(package))
+        if created_after:
+            clauses.append("created_at >= ?")
+            params.append(created_after)
+        if created_before:
+            clauses.append("created_at < ?")
+            params.append(created_before)
+        
+        comparison = "<" if descending else ">"
+        if cursor:
+            cursor_sort, cursor_descending, value, name = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+            if cursor_sort != sort or cursor_descending != descending:
+                raise ValueError("cursor belongs to a listing with a different sort order")
+            # A row value comparison lets SQLite seek straight to the page on the (column, name) index
+            clauses.append(f"({column}, name) {comparison} (?, ?)")
+            params += [value, name]
+        
+        direction = "DESC" if descending else "ASC"
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT * FROM assignments WHERE {' AND '.join(clauses) or 1} "
+                f"ORDER BY {column} {direction}, name {direction} LIMIT ?",
+                params + [limit + 1]
+            ).fetchall()
+        
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last = rows[-1]
+            next_cursor = base64.urlsafe_b64encode(
+                json.dumps([sort, descending, last[column], last["name"]]).encode("utf-8")
+            ).decode("ascii")
+        
+        assignments = [{
+            "name": row["name"],
+            "language": row["language"],
+            "requirements": json.loads(row["requirements"]),
+            "created_at": row["created_at"],
+            "size_bytes": row["size_bytes"],
+            "last_used": row["last_used"] or None
+        } for row in rows]
+        return assignments, next_cursor
+
+assignment_catalog = AssignmentCatalog(CATALOG_DB_PATH, CATALOG_LAST_USED_RESOLUTION_SECONDS)
+
+class EnvironmentStore:
+    """Environments shared by all assignments with the same language, runtime version and requirements.
+    
+    Each environment lives in <root>/<key> and is complete once its environment.json exists. Its refs
+    directory holds one file per assignment linking to it, and the last release removes it.
+    Environments with requirements that failed or were relaxed are not shared: the next assignment
+    asking for them builds its own in <root>/<key>-<assignment>, and they are rebuilt when only the
+    re-created assignment itself uses them.
+    """
+
+    # What an assignment links to in its environment, per language
+    LINKS = {"python": ["venv"], "javascript": ["node_modules", "package.json"]}
+
+    def __init__(self, root):
+        self.root = root
+        self._key_locks = collections.defaultdict(threading.Lock)
+        self._lock = threading.Lock()
+        self._sizes = {}
+        os.makedirs(root, exist_ok=True)
+
+    def key(self, language, requirements):
+        normalized = sorted({normalize_requirement(requirement, language) for requirement in requirements})
+        payload = json.dumps([language, get_runtime_version(language), normalized])
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
+
+    def _key_lock(self, key):
+        with self._lock:
+            return self._key_locks[key]
+
+    def acquire(self, assignment_name, language, requirements, build):
+        """Reference the environment for language and requirements and return its environment.json contents.
+        
+        A missing environment is built first with build(environment_dir), which returns
+        what to record about it (e.g. the install report) alongside the key and requirements.
+        """
+        shared_key = self.key(language, requirements)
+        for key in (shared_key, f"{shared_key}-{assignment_name}"):
+            info = self._acquire(key, assignment_name, language, requirements, build)
+            if info is not None:
+                return info
+
+    def _acquire(self, key, assignment_name, language, requirements, build):
+        """acquire() for one environment directory, or None if other assignments hold it with an incomplete install"""
+        environment_dir = os.path.join(self.root, key)
+        info_path = os.path.join(environment_dir, "environment.json")
+        with self._key_lock(key):
+            info = None
+            with contextlib.suppress(OSError, ValueError):
+                with open(info_path, "r") as f:
+                    info = json.load(f)
+            
+            if info is not None and not all(entry["status"] == "installed" for entry in info["install_report"]):
+                users = set(os.listdir(os.path.join(environment_dir, "refs"))) - {assignment_name}
+                if users:
+                    return None
+                # Only the re-created assignment used it: retry the install
+                logger.info(f"Rebuilding {language} environment {key}, some of its requirements did not install")
+                info = None
+            
+            if info is not None:
+                logger.info(f"Reusing shared {language} environment {key} for {assignment_name}")
+            else:
+                # Nothing references an environment whose build never finished
+                shutil.rmtree(environment_dir, ignore_errors=True)
+                os.makedirs(os.path.join(environment_dir, "refs"))
+                try:
+                    info = {
+                        "key": key,
+                        "language": language,
+                        "runtime_version": get_runtime_version(language),
+                        "requirements": list(requirements),
+                        "created_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+                        **build(environment_dir)
+                    }
+                    with tempfile.NamedTemporaryFile("w", dir=environment_dir, suffix=".tmp", delete=False) as f:
+                        json.dump(info, f)
+                    os.replace(f.name, info_path)
+                except BaseException:
+                    shutil.rmtree(environment_dir, ignore_errors=True)
+                    raise
+                logger.info(f"Built shared {language} environment {key} for {assignment_name}")
+            
+            with open(os.path.join(environment_dir, "refs", assignment_name), "w"):
+                pass
+        return info
+
+    def size(self, key):
+        """Bytes an environment takes on disk, remembered until it is rebuilt; 0 if it doesn't exist"""
+        try:
+            built_at = os.stat(os.path.join(self.root, key, "environment.json")).st_mtime_ns
+        except OSError:
+            return 0
+        cached = self._sizes.get(key)
+        if cached is None or cached[0] != built_at:
+            cached = (built_at, directory_size(os.path.join(self.root, key)))
+            self._sizes[key] = cached
+        return cached[1]
+
+    def link(self, key, assignment_dir, language):
+        """Point an assignment's environment paths at the shared environment"""
+        for name in self.LINKS[language]:
+            os.symlink(os.path.join(self.root, key, name), os.path.join(assignment_dir, name))
+
+    def release(self, assignment_name, key):
+        """Drop an assignment's reference, removing the environment once nothing references it"""
+        environment_dir = os.path.join(self.root, key)
+        with self._key_lock(key):
+            with contextlib.suppress(FileNotFoundError):
+                os.unlink(os.path.join(environment_dir, "refs", assignment_name))
+            with contextlib.suppress(FileNotFoundError):
+                if not os.listdir(os.path.join(environment_dir, "refs")):
+                    shutil.rmtree(environment_dir, ignore_errors=True)
+                    self._sizes.pop(key, None)
+                    logger.info(f"Removed shared environment {key}, no assignment uses it anymore")
+
+    def prune(self, assignment_names):
+        """Drop references of assignments that no longer exist and remove unreferenced or unfinished environments"""
+        assignment_names = set(assignment_names)
+        for entry in os.scandir(self.root):
+            if not entry.is_dir(follow_symlinks=False):
+                continue
+            refs_dir = os.path.join(entry.path, "refs")
+            with self._key_lock(entry.name):
+                with contextlib.suppress(FileNotFoundError):
+                    for name in os.listdir(refs_dir):
+                        if name not in assignment_names:
+                            os.unlink(os.path.join(refs_dir, name))
+                complete = os.path.exists(os.path.join(entry.path, "environment.json"))
+                if not complete or not os.path.isdir(refs_dir) or not os.listdir(refs_dir):
+                    shutil.rmtree(entry.path, ignore_errors=True)
+                    logger.info(f"Pruned shared environment {entry.name}")
+
+    def list(self):
+        """Complete environments with the assignments using them"""
+        environments = []
+        for entry in os.scandir(self.root):
+            try:
+                with open(os.path.join(entry.path, "environment.json"), "r") as f:
+                    info = json.load(f)
+                assignments = sorted(os.listdir(os.path.join(entry.path, "refs")))
+            except (OSError, ValueError):
+                continue
+            environments.append({
+                "key": info["key"],
+                "language": info["language"],
+                "runtime_version": info["runtime_version"],
+                "requirements": info["requirements"],
+                "created_at": info["created_at"],
+                "assignments": assignments,
+                "size_bytes": self.size(entry.name)
+            })
+        return sorted(environments, key=lambda environment: environment["created_at"])
+
+environment_store = EnvironmentStore(ENVIRONMENT_STORE_DIR)
+
+# ioctl cloning a file's extents into another (Linux), missing from fcntl before Python 3.12
+FICLONE = getattr(fcntl, "FICLONE", 0x40049409)
+
+def clone_file(source, destination, method):
+    """Make destination a reflink, hardlink or copy of source"""
+    if method == "reflink":
+        if fcntl is None:
+            raise OSError("reflinks are not supported on this platform")
+        with open(source, "rb") as src, open(destination, "wb") as dst:
+            fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+        shutil.copystat(source, destination)
+    elif method == "hardlink":
+        os.link(source, destination)
+    else:
+        shutil.copy2(source, destination)
+
+def clone_tree(source, destination):
+    """Copy a directory tree sharing file data where the filesystem allows it.
+    
+    Tries reflinks, then hardlinks, then plain copies, and keeps the first that works.
+    Returns the method used for the last file.
+    """
+    methods = ["reflink", "hardlink", "copy"]
+    for root, dirs, files in os.walk(source):
+        target_root = os.path.join(destination, os.path.relpath(root, source))
+        os.makedirs(target_root, exist_ok=True)
+        shutil.copymode(root, target_root)
+        for name in dirs + files:
+            source_path = os.path.join(root, name)
+            target_path = os.path.join(target_root, name)
+            if os.path.islink(source_path):
+                os.symlink(os.readlink(source_path), target_path)
+                continue
+            if name in dirs:
+                continue
+            while True:
+                try:
+                    clone_file(source_path, target_path, methods[0])
+                    break
+                except OSError:
+                    if len(methods) == 1:
+                        raise
+                    with contextlib.suppress(FileNotFoundError):
+                        os.unlink(target_path)
+                    methods.pop(0)
+    return methods[0]
+
+class VenvTemplates:
+    """Prebuilt base venvs cloned for new Python environments.
+    
+    A template is built in <root>/<name>/venv and described by template.json, including its
+    installed packages. A missing venv, new interpreter version or package list rebuilds it.
+    """
+
+    def __init__(self, root, templates):
+        self.root = root
+        self.templates = templates
+        self._locks = {name: threading.Lock() for name in templates}
+        self._building = set()
+        self._building_lock = threading.Lock()
+
+    def built(self, name):
+        """template.json contents of a template that is built and up to date, or None"""
+        template_dir = os.path.join(self.root, name)
+        try:
+            with open(os.path.join(template_dir, "template.json"), "r") as f:
+                info = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if (info.get("runtime_version") != get_runtime_version("python")
+                or info.get("requirements") != self.templates[name]
+                or not os.path.exists(get_python_path(template_dir))):
+            return None
+        return info
+
+    def build_in_background(self, name):
+        """Start building a template in a thread unless it is already being built"""
+        with self._building_lock:
+            if name in self._building:
+                return
+            self._building.add(name)
+        
+        def build():
+            try:
+                self.get(name)
+            except Exception as e:
+                logger.warning(f"Could not build the {name} venv template: {str(e)}")
+            finally:
+                with self._building_lock:
+                    self._building.discard(name)
+        threading.Thread(target=build, name=f"venv-template-{name}", daemon=True).start()
+
+    def get(self, name):
+        """template.json contents of a template, building it first if it is missing or outdated"""
+        template_dir = os.path.join(self.root, name)
+        info_path = os.path.join(template_dir, "template.json")
+        with self._locks[name]:
+            info = self.built(name)
+            if info is not None:
+                return info
+            
+            shutil.rmtree(template_dir, ignore_errors=True)
+            os.makedirs(template_dir)
+            start_time = time.time()
+            install_report = setup_python_environment(template_dir, self.templates[name], template=False)
+            # Compiled once here, clones share the bytecode
+            prepare_python_startup(template_dir)
+            venv_dir = os.path.join(template_dir, "venv")
+            info = {
+                "name": name,
+                "requirements": self.templates[name],
+                "runtime_version": get_runtime_version("python"),
+                "venv_dir": venv_dir,
+                "packages": list_python_packages(os.path.join(venv_dir, "Scripts" if os.name == "nt" else "bin", "pip")),
+                "install_report": install_report,
+                "build_seconds": round(time.time() - start_time, 2),
+                "created_at": time.strftime("%Y-%m-%d %H:%M:%S")
+            }
+            with tempfile.NamedTemporaryFile("w", dir=template_dir, suffix=".tmp", delete=False) as f:
+                json.dump(info, f)
+            os.replace(f.name, info_path)
+            logger.info(f"Built the {name} venv template in {info['build_seconds']}s")
+            return info
+
+    def select(self, requirements):
+        """(name, template.json contents) of the template to clone for requirements.
+        
+        The template providing most of their packages wins, unless it pins one of them to
+        another version than a requirement does. Only built templates are considered, others
+        are built in the background for later assignments. bare is used when none fits.
+        """
+        names = {requirement_name(requirement) for requirement in requirements}
+        coverage = {name: len(names & {requirement_name(package) for package in packages})
+                    for name, packages in self.templates.items()}
+        for name in sorted(self.templates, key=lambda name: -coverage[name]):
+            if coverage[name] == 0:
+                break
+            # Pins against the template's own requirement list rule it out without looking further
+            pinned = {requirement_name(package): normalize_requirement(package) for package in self.templates[name] if "==" in package}
+            if any(requirement_name(requirement) in pinned and normalize_requirement(requirement) != pinned[requirement_name(requirement)]
+                   and "==" in requirement for requirement in requirements):
+                continue
+            info = self.built(name)
+            if info is None:
+                self.build_in_background(name)
+                continue
+            conflicts = [
+                requirement for requirement in requirements
+                if requirement_name(requirement) in info["packages"]
+                and normalize_requirement(requirement)[len(requirement_name(requirement)):].strip().startswith("==")
+                and not requirement_provided(requirement, info["packages"])
+            ]
+            if not conflicts:
+                return name, info
+        return "bare", self.get("bare")
+
+    def clone(self, name, venv_dir):
+        """Clone a built template's venv to venv_dir and return how files were shared ('reflink', 'hardlink' or 'copy')"""
+        source = os.path.join(self.root, name, "venv")
+        method = clone_tree(source, venv_dir)
+        
+        # pyvenv.cfg, activate scripts and script shebangs name the venv they were made for.
+        # Rewritten files are replaced rather than edited, so hardlinked templates stay intact
+        scripts_dir = os.path.join(venv_dir, "Scripts" if os.name == "nt" else "bin")
+        candidates = [os.path.join(venv_dir, "pyvenv.cfg")] + [os.path.join(scripts_dir, script) for script in os.listdir(scripts_dir)]
+        for path in candidates:
+            if os.path.islink(path) or not os.path.isfile(path):
+                continue
+            with open(path, "rb") as f:
+                content = f.read()
+            if source.encode() not in content:
+                continue
+            with tempfile.NamedTemporaryFile("wb", dir=os.path.dirname(path), delete=False) as f:
+                f.write(content.replace(source.encode(), venv_dir.encode()))
+            shutil.copymode(path, f.name)
+            os.replace(f.name, path)
+        return method
+
+venv_templates = VenvTemplates(VENV_TEMPLATE_DIR, VENV_TEMPLATES)
+
+class NodePackageStore:
+    """Content-addressed store of node_modules files, in the manner of pnpm.
+    
+    files/ holds each file once under its sha256 (and executable bit), and node_modules trees are
+    hardlinks into it, so paths inside node_modules and NODE_PATH resolution stay as npm laid them
+    out. manifests/<key>.json records a finished install of a requirement list: its tree,
+    package.json, package-lock.json and install report.
+    """
+
+    def __init__(self, root):
+        self.files_dir = os.path.join(root, "files")
+        self.manifests_dir = os.path.join(root, "manifests")
+        os.makedirs(self.files_dir, exist_ok=True)
+        os.makedirs(self.manifests_dir, exist_ok=True)
+
+    def key(self, requirements):
+        normalized = sorted({normalize_requirement(requirement, "javascript") for requirement in requirements})
+        payload = json.dumps([get_runtime_version("javascript"), normalized])
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
+
+    def _file_path(self, digest, executable):
+        return os.path.join(self.files_dir, digest[:2], digest + ("-x" if executable else ""))
+
+    def manifest(self, key):
+        """Recorded install for a key, or None"""
+        try:
+            with open(os.path.join(self.manifests_dir, f"{key}.json"), "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def add_tree(self, key, project_dir, install_report):
+        """Move a project's node_modules files into the store, leaving hardlinks behind, and record the install"""
+        node_modules = os.path.join(project_dir, "node_modules")
+        files = {}
+        symlinks = {}
+        for root, dirs, names in os.walk(node_modules):
+            for name in dirs + names:
+                path = os.path.join(root, name)
+                relative_path = os.path.relpath(path, node_modules)
+                if os.path.islink(path):
+                    symlinks[relative_path] = os.readlink(path)
+                    continue
+                if name in dirs:
+                    continue
+                
+                digest = hashlib.sha256()
+                with open(path, "rb") as f:
+                    for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                        digest.update(chunk)
+                executable = bool(os.stat(path).st_mode & 0o111)
+                stored_path = self._file_path(digest.hexdigest(), executable)
+                os.makedirs(os.path.dirname(stored_path), exist_ok=True)
+                try:
+                    os.link(path, stored_path)
+                except FileExistsError:
+                    # Already stored by another tree: share that copy instead
+                    temp_path = f"{path}.store-{uuid.uuid4().hex}"
+                    os.link(stored_path, temp_path)
+                    os.replace(temp_path, path)
+                files[relative_path] = [digest.hexdigest(), executable]
+        
+        manifest = {"files": files, "symlinks": symlinks, "install_report": install_report}
+        for name in ("package.json", "package-lock.json"):
+            with contextlib.suppress(OSError, ValueError):
+                with open(os.path.join(project_dir, name), "r") as f:
+                    manifest[name] = json.load(f)
+        with tempfile.NamedTemporaryFile("w", dir=self.manifests_dir, suffix=".tmp", delete=False) as f:
+            json.dump(manifest, f)
+        os.replace(f.name, os.path.join(self.manifests_dir, f"{key}.json"))
+
+    def link_tree(self, manifest, project_dir):
+        """Lay out a recorded install in project_dir from hardlinks, returning False if store files are missing.
+        
+        package.json and package-lock.json are written either way, so npm ci can rebuild the same tree.
+        """
+        for name in ("package.json", "package-lock.json"):
+            if name in manifest:
+                content = dict(manifest[name], name=os.path.basename(project_dir))
+                with open(os.path.join(project_dir, name), "w") as f:
+                    json.dump(content, f, indent=2)
+        
+        node_modules = os.path.join(project_dir, "node_modules")
+        try:
+            for relative_path, (digest, executable) in manifest["files"].items():
+                path = os.path.join(node_modules, relative_path)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                os.link(self._file_path(digest, executable), path)
+            for relative_path, target in manifest["symlinks"].items():
+                path = os.path.join(node_modules, relative_path)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                os.symlink(target, path)
+        except OSError as e:
+            logger.warning(f"Could not link node_modules from the package store: {str(e)}")
+            shutil.rmtree(node_modules, ignore_errors=True)
+            os.makedirs(node_modules)
+            return False
+        return True
+
+node_package_store = NodePackageStore(NODE_STORE_DIR)
+
+# Wakes idle job workers when something is queued, and long-polling clients when their job finishes
+jobs_available = asyncio.Event()
+job_finished_events = {}
+job_workers = []
+
+class ExecutionLimiter:
+    """Bounds how many executions run at once, overall and per language"""
+
+    def __init__(self, max_concurrent, language_limits):
+        self._global = asyncio.Semaphore(max_concurrent)
+        self._languages = {language: asyncio.Semaphore(limit) for language, limit in language_limits.items()}
+
+    @contextlib.asynccontextmanager
+    async def slot(self, language):
+        # Wait for the language first so a busy language doesn't hold global slots while queued
+        async with self._languages[language]:
+            async with self._global:
+                yield
+
+execution_limiter = ExecutionLimiter(MAX_CONCURRENT_EXECUTIONS, LANGUAGE_CONCURRENCY)
+
+def get_execution_limits(metadata):
+    """Execution limits of an assignment, with the server defaults filled in"""
+    limits = ExecutionLimits(**metadata.get("limits", {}))
+    defaults = {
+        "compile_timeout": COMPILE_TIMEOUT_SECONDS,
+        "run_timeout": RUN_TIMEOUT_SECONDS,
+        "compile_memory_mb": COMPILE_MEMORY_LIMIT_MB,
+        "memory_mb": MEMORY_LIMIT_MB,
+        "cpu_seconds": CPU_TIME_LIMIT_SECONDS,
+        "output_limit_bytes": OUTPUT_LIMIT_BYTES
+    }
+    for name, default in defaults.items():
+        if getattr(limits, name) is None:
+            setattr(limits, name, default)
+    return limits
+
+def compile_limits(limits):
+    """Limits applied to the compiler: its own memory cap, no CPU limit beyond the compile timeout"""
+    return ExecutionLimits(memory_mb=limits.compile_memory_mb, cpu_seconds=0)
+
+def resource_usage(rusage):
+    """Result fields describing a finished child's resource usage"""
+    if rusage is None:
+        return {}
+    return {
+        "cpu_time_user": round(rusage.ru_utime, 3),
+        "cpu_time_system": round(rusage.ru_stime, 3),
+        "peak_memory_kb": rusage.ru_maxrss  # Kilobytes on Linux
+    }
+
+def cpu_limit_message(limits):
+    """Note appended to stderr when a process is stopped for using too much CPU time"""
+    return f"\nCPU time limit of {limits.cpu_seconds} seconds exceeded; execution terminated\n"
+
+def cpu_limit_exceeded(returncode, rusage, limits):
+    """Whether a process was killed by its RLIMIT_CPU"""
+    if not (limits and limits.cpu_seconds) or rusage is None:
+        return False
+    # SIGKILL follows the hard limit one second later if SIGXCPU was handled or ignored
+    return returncode == -signal.SIGXCPU or (
+        returncode == -signal.SIGKILL and rusage.ru_utime + rusage.ru_stime >= limits.cpu_seconds
+    )
+
+class ChildProcess:
+    """An execution started by the process spawner, with asyncio pipes to its stdio"""
+
+    def __init__(self, pid, stdin, stdout, stderr, exited):
+        self.pid = pid
+        self.stdin = stdin
+        self.stdout = stdout
+        self.stderr = stderr
+        self.returncode = None
+        self.rusage = None
+        self._exited = exited
+        exited.add_done_callback(self._set_exited)
+
+    def _set_exited(self, exited):
+        self.returncode, self.rusage = exited.result()
+
+    async def wait(self):
+        await asyncio.shield(self._exited)
+        return self.returncode
+
+    def kill(self):
+        if self.returncode is None:
+            try:
+                os.kill(self.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+
+class ProcessSpawner:
+    """Small helper process that forks and reaps executions for the server.
+    
+    Linux carries a process's peak RSS over fork and exec, so children forked by the server
+    itself would all report at least the server's memory as their ru_maxrss. The spawner
+    has executions forked by a short-lived /bin/sh for the same reason.
+    """
+
+    def __init__(self, process, sock):
+        self.process = process
+        self.sock = sock
+        self._pending = {}
+        self._next_id = 0
+        # Not a background task: it runs until close(), after background tasks are drained
+        self._reader = asyncio.ensure_future(self._read_messages())
+
+    @classmethod
+    async def start(cls):
+        sock, child_sock = socket.socketpair(socket.AF_UNIX, socket.SOCK_SEQPACKET)
+        try:
+            process = await asyncio.create_subprocess_exec(
+                sys.executable, "-S", "-c", PROCESS_SPAWNER_SCRIPT, str(child_sock.fileno()),
+                pass_fds=[child_sock.fileno()]
+            )
+        finally:
+            child_sock.close()
+        sock.setblocking(False)
+        return cls(process, sock)
+
+    async def _read_messages(self):
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                data = await loop.sock_recv(self.sock, 65536)
+                if not data:
+                    break
+                message = json.loads(data)
+                started, exited = self._pending.get(message["id"], (None, None))
+                if started is None:
+                    continue
+                if "error" in message:
+                    if not started.done():
+                        started.set_exception(OSError(message["error"]))
+                    del self._pending[message["id"]]
+                elif "pid" in message:
+                    if started.done():
+                        # Whoever asked for this child was cancelled before it started
+                        with contextlib.suppress(ProcessLookupError):
+                            os.kill(message["pid"], signal.SIGKILL)
+                    else:
+                        started.set_result(message["pid"])
+                else:
+                    if not exited.done():
+                        exited.set_result((message["returncode"], resource.struct_rusage(message["rusage"])))
+                    del self._pending[message["id"]]
+        except (OSError, ValueError) as e:
+            logger.warning(f"Process spawner sent an unreadable message: {str(e)}")
+        finally:
+            # The spawner is gone and nobody will report on its children any more
+            for started, exited in self._pending.values():
+                if not started.done():
+                    started.set_exception(OSError("Process spawner exited"))
+                if not exited.done():
+                    exited.set_result((-signal.SIGKILL, None))
+            self._pending.clear()
+
+    def is_alive(self):
+        return self.process.returncode is None and not self._reader.done()
+
+    async def spawn(self, args, cwd=None, env=None, limits=None):
+        """Start a command with piped stdio, optionally under memory and CPU rlimits"""
+        loop = asyncio.get_running_loop()
+        self._next_id += 1
+        request_id = self._next_id
+        started = loop.create_future()
+        exited = loop.create_future()
+        self._pending[request_id] = (started, exited)
+        
+        stdin_read, stdin_write = os.pipe()
+        stdout_read, stdout_write = os.pipe()
+        stderr_read, stderr_write = os.pipe()
+        request = {
+            "id": request_id,
+            "args": args,
+            "cwd": cwd,
+            "env": env if env is not None else dict(os.environ),
+            "memory_mb": limits.memory_mb if limits else 0,
+            "cpu_seconds": limits.cpu_seconds if limits else 0
+        }
+        try:
+            payload = json.dumps(request).encode("utf-8")
+            while True:
+                try:
+                    socket.send_fds(self.sock, [payload], [stdin_read, stdout_write, stderr_write])
+                    break
+                except BlockingIOError:
+                    await asyncio.sleep(0.001)
+        except BaseException:
+            self._pending.pop(request_id, None)
+            for fd in (stdin_write, stdout_read, stderr_read):
+                os.close(fd)
+            raise
+        finally:
+            for fd in (stdin_read, stdout_write, stderr_write):
+                os.close(fd)
+        
+        stdin_file = os.fdopen(stdin_write, "wb", buffering=0)
+        stdout_file = os.fdopen(stdout_read, "rb", buffering=0)
+        stderr_file = os.fdopen(stderr_read, "rb", buffering=0)
+        try:
+            pid = await started
+        except BaseException:
+            for pipe in (stdin_file, stdout_file, stderr_file):
+                pipe.close()
+            if started.done() and not started.cancelled() and started.exception() is None:
+                # Started just before the cancellation arrived
+                with contextlib.suppress(ProcessLookupError):
+                    os.kill(started.result(), signal.SIGKILL)
+            elif not started.done():
+                started.cancel()
+            # Otherwise the entry stays pending, so the reader kills the child once its pid arrives
+            # and drops the entry when it is reaped
+            raise
+        
+        stdout = asyncio.StreamReader()
+        await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(stdout), stdout_file)
+        stderr = asyncio.StreamReader()
+        await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(stderr), stderr_file)
+        transport, protocol = await loop.connect_write_pipe(asyncio.streams.FlowControlMixin, stdin_file)
+        stdin = asyncio.StreamWriter(transport, protocol, None, loop)
+        return ChildProcess(pid, stdin, stdout, stderr, exited)
+
+    async def close(self):
+        self._reader.cancel()
+        await asyncio.gather(self._reader, return_exceptions=True)
+        self.sock.close()
+        await self.process.wait()
+
+process_spawner = None
+process_spawner_lock = asyncio.Lock()
+
+# The spawner passes fds over a SOCK_SEQPACKET socket and applies rlimits in the forked child
+PROCESS_SPAWNER_SUPPORTED = resource is not None and hasattr(socket, "send_fds")
+
+async def spawn_process(args, cwd=None, env=None, limits=None):
+    """Start a command with piped stdio through the process spawner, starting the spawner if needed"""
+    global process_spawner
+    if not PROCESS_SPAWNER_SUPPORTED:
+        # No limits or rusage here; readers treat a missing rusage as unknown
+        return await asyncio.create_subprocess_exec(
+            *args,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            cwd=cwd,
+            env=env
+        )
+    async with process_spawner_lock:
+        if process_spawner is None or not process_spawner.is_alive():
+            process_spawner = await ProcessSpawner.start()
+        spawner = process_spawner
+    return await spawner.spawn(args, cwd=cwd, env=env, limits=limits)
+
+async def feed_stdin(process, input_data):
+    """Write input to the process and close its stdin, ignoring a process that exits without reading it"""
+    try:
+        if input_data:
+            process.stdin.write(input_data)
+            await process.stdin.drain()
+    except (BrokenPipeError, ConnectionResetError):
+        pass
+    finally:
+        process.stdin.close()
+
+class OutputBuffer:
+    """Keeps the head and tail of a byte stream within a fixed capacity, counting what is cut in between"""
+
+    def __init__(self, capacity):
+        self.head_size = capacity // 2
+        self.tail_size = capacity - self.head_size
+        self.head = bytearray()
+        self.tail = bytearray()
+        self.total = 0
+
+    def write(self, data):
+        self.total += len(data)
+        room = self.head_size - len(self.head)
+        if room > 0:
+            self.head += data[:room]
+            data = data[room:]
+        if data:
+            self.tail += data
+            if len(self.tail) > self.tail_size:
+                del self.tail[:len(self.tail) - self.tail_size]
+
+    @property
+    def truncated(self):
+        return self.total > len(self.head) + len(self.tail)
+
+    def getvalue(self):
+        if not self.truncated:
+            return (self.head + self.tail).decode("utf-8", errors="replace")
+        omitted = self.total - len(self.head) - len(self.tail)
+        return (
+            self.head.decode("utf-8", errors="replace")
+            + f"\n... [{omitted} bytes truncated] ...\n"
+            + self.tail.decode("utf-8", errors="replace")
+        )
+
+def output_limit_message(limit):
+    """Note appended to stderr when a process is killed for printing too much"""
+    return f"\nOutput limit of {limit} bytes exceeded; execution terminated\n"
+
+async def read_output(stream, name, buffer, on_output, on_data, on_stop):
+    """Read a pipe until EOF into buffer as it is produced, passing each decoded chunk to on_output"""
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    while True:
+        data = await stream.read(OUTPUT_CHUNK_SIZE)
+        if not data:
+            return
+        buffer.write(data)
+        on_data()
+        if on_output is not None:
+            text = decoder.decode(data)
+            if text and on_output(name, text):
+                on_stop()
+
+# Outcome of a finished child process; rusage is None for processes not started by spawn_process
+ProcessOutput = collections.namedtuple("ProcessOutput", ["returncode", "stdout", "stderr", "truncated", "rusage", "output_limit_exceeded"])
+
+def process_result_fields(result, limits):
+    """ExecutionResult fields for a finished run, noting when it hit its CPU limit"""
+    error = result.stderr
+    timed_out = cpu_limit_exceeded(result.returncode, result.rusage, limits)
+    if timed_out:
+        error += cpu_limit_message(limits)
+    return {
+        "output": result.stdout,
+        "error": error,
+        "timed_out": timed_out,
+        "exit_code": result.returncode,
+        "output_truncated": result.truncated,
+        "output_limit_exceeded": result.output_limit_exceeded,
+        **resource_usage(result.rusage)
+    }
+
+async def communicate_with_timeout(process, input_data, timeout, on_output=None, output_limit=OUTPUT_LIMIT_BYTES):
+    """Feed input to a started process and collect its output, killing it when the timeout expires.
+    
+    Returns a ProcessOutput. Each stream keeps at most OUTPUT_CAPTURE_BYTES,
+    and the process is killed once it writes more than output_limit bytes in total (0 disables).
+    on_output(stream_name, text) is called with every stdout/stderr chunk as soon as it arrives;
+    the process is killed as soon as it returns a true value.
+    """
+    stdout = OutputBuffer(OUTPUT_CAPTURE_BYTES)
+    stderr = OutputBuffer(OUTPUT_CAPTURE_BYTES)
+    limit_exceeded = False
+    
+    def check_output_limit():
+        nonlocal limit_exceeded
+        if output_limit and not limit_exceeded and stdout.total + stderr.total > output_limit:
+            limit_exceeded = True
+            process.kill()
+    
+    try:
+        await asyncio.wait_for(
+            asyncio.gather(
+                feed_stdin(process, input_data),
+                read_output(process.stdout, "stdout", stdout, on_output, check_output_limit, process.kill),
+                read_output(process.stderr, "stderr", stderr, on_output, check_output_limit, process.kill),
+                process.wait()
+            ),
+            timeout
+        )
+    except (asyncio.TimeoutError, asyncio.CancelledError):
+        # Also when the caller goes away, e.g. a streaming client disconnecting
+        process.kill()
+        await process.wait()
+        raise
+    
+    error = stderr.getvalue()
+    if limit_exceeded:
+        error += output_limit_message(output_limit)
+    return ProcessOutput(
+        process.returncode,
+        stdout.getvalue(),
+        error,
+        stdout.truncated or stderr.truncated or limit_exceeded,
+        getattr(process, "rusage", None),
+        limit_exceeded
+    )
+
+async def run_process(args, timeout, input_data=b"", cwd=None, env=None, on_output=None, limits=None):
+    """Run a command to completion, returning a ProcessOutput or raising asyncio.TimeoutError"""
+    process = await spawn_process(args, cwd=cwd, env=env, limits=limits)
+    output_limit = limits.output_limit_bytes if limits and limits.output_limit_bytes is not None else OUTPUT_LIMIT_BYTES
+    return await communicate_with_timeout(process, input_data, timeout, on_output, output_limit)
+
+def spawn_background(coroutine):
+    """Run a coroutine as a task that is kept referenced until it finishes"""
+    task = asyncio.ensure_future(coroutine)
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+    return task
+
+background_tasks = set()
+
+class PythonInterpreterPool:
+    """Keeps single-use interpreters of one assignment venv started and waiting for code"""
+
+    def __init__(self, python_args, size, limits):
+        self.python_args = python_args
+        self.size = size
+        self.limits = limits
+        self.last_used = time.monotonic()
+        self._idle = collections.deque()
+        self._closed = False
+
+    async def _replenish(self):
+        try:
+            process = await spawn_process(self.python_args, limits=self.limits)
+        except Exception as e:
+            logger.warning(f"Could not start pooled interpreter {self.python_args[0]}: {str(e)}")
+            return
+        
+        if not self._closed and len(self._idle) < self.size:
+            self._idle.append(process)
+            return
+        
+        # Pool was closed or filled up in the meantime
+        process.kill()
+        await process.wait()
+
+    def fill(self):
+        """Start interpreters in the background until the pool is full"""
+        for _ in range(self.size - len(self._idle)):
+            spawn_background(self._replenish())
+
+    def acquire(self):
+        """Take a waiting interpreter (or None) and start its replacement in the background"""
+        process = None
+        while self._idle:
+            candidate = self._idle.popleft()
+            if candidate.returncode is None:
+                process = candidate
+                break
+        
+        spawn_background(self._replenish())
+        return process
+
+    async def close(self):
+        """Kill all waiting interpreters, e.g. because the venv is being replaced"""
+        self._closed = True
+        idle = list(self._idle)
+        self._idle.clear()
+        
+        for process in idle:
+            process.kill()
+            await process.wait()
+
+# Interpreter pools by assignment directory, least recently used first
+python_pools = collections.OrderedDict()
+
+def get_python_pool(assignment_dir, python_args, limits):
+    """Return the interpreter pool of an assignment, creating and filling it on first use"""
+    if PYTHON_POOL_SIZE <= 0:
+        return None
+    
+    pool = python_pools.get(assignment_dir)
+    if pool is None:
+        pool = PythonInterpreterPool(python_args, PYTHON_POOL_SIZE, limits)
+        python_pools[assignment_dir] = pool
+        pool.fill()
+    python_pools.move_to_end(assignment_dir)
+    pool.last_used = time.monotonic()
+    
+    # Interpreters taken from a closed pool keep running, only the waiting ones are killed
+    while len(python_pools) > MAX_PYTHON_POOLS:
+        _, evicted = python_pools.popitem(last=False)
+        spawn_background(evicted.close())
+    return pool
+
+async def discard_python_pool(assignment_dir):
+    """Shut down the interpreter pool of an assignment if it has one"""
+    pool = python_pools.pop(assignment_dir, None)
+    if pool is not None:
+        await pool.close()
+
+class NodeWorkerHost:
+    """Long-lived Node.js process running one assignment's submissions in fresh worker threads"""
+
+    def __init__(self, process):
+        self.process = process
+        self.last_used = time.monotonic()
+        self._pending = {}
+        self._next_id = 0
+        self._reader = spawn_background(self._read_results())
+
+    @classmethod
+    async def start(cls, assignment_dir, size, limits):
+        process = await asyncio.create_subprocess_exec(
+            "node", NODE_WORKER_HOST, str(size), str(limits.memory_mb), str(os.sysconf("SC_CLK_TCK")),
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            env=get_node_env(assignment_dir),
+            cwd=assignment_dir,  # Resolve modules from the assignment directory
+            limit=NODE_HOST_MESSAGE_LIMIT
+        )
+        return cls(process)
+
+    async def _read_results(self):
+        try:
+            async for line in self.process.stdout:
+                message = json.loads(line)
+                if message.get("type") == "output":
+                    waiter, on_output = self._pending.get(message["id"], (None, None))
+                    if on_output is not None and on_output(message["stream"], message["data"]):
+                        self._pending[message["id"]] = (waiter, None)
+                        self.cancel(message["id"])
+                    continue
+                
+                waiter, _ = self._pending.pop(message["id"], (None, None))
+                if waiter is not None and not waiter.done():
+                    waiter.set_result(message)
+        except (ValueError, OSError) as e:
+            logger.warning(f"Node.js worker host sent an unreadable message: {str(e)}")
+        
+        # The host exited, wake up everyone still waiting for a result
+        for waiter, _ in self._pending.values():
+            if not waiter.done():
+                waiter.set_result(None)
+        self._pending.clear()
+
+    def is_alive(self):
+        return self.process.returncode is None and not self._reader.done()
+
+    def is_busy(self):
+        """Whether jobs are running that closing the host would kill"""
+        return bool(self._pending)
+
+    def cancel(self, job_id):
+        """Terminate the worker of a running job; its result still arrives as usual"""
+        self.process.stdin.write((json.dumps({"id": job_id, "cancel": True}) + "\n").encode("utf-8"))
+
+    async def run(self, code, stdin, limits, on_output=None):
+        """Run code in a fresh worker, returning the host's result or None if the host died"""
+        self._next_id += 1
+        job_id = self._next_id
+        waiter = asyncio.get_running_loop().create_future()
+        self._pending[job_id] = (waiter, on_output)
+        
+        job = {
+            "id": job_id,
+            "code": code,
+            "stdin": stdin,
+            "timeout": limits.run_timeout,
+            "cpuLimit": limits.cpu_seconds,
+            "stream": on_output is not None,
+            "outputCapture": OUTPUT_CAPTURE_BYTES,
+            "outputLimit": limits.output_limit_bytes
+        }
+        try:
+            self.process.stdin.write((json.dumps(job) + "\n").encode("utf-8"))
+            await self.process.stdin.drain()
+            # The host enforces the timeout itself, only guard against it hanging
+            return await asyncio.wait_for(waiter, limits.run_timeout + 5)
+        except asyncio.TimeoutError:
+            return None
+        except asyncio.CancelledError:
+            # Nobody waits for the result any more, so don't leave the worker running
+            if self.process.returncode is None:
+                self.cancel(job_id)
+            raise
+        finally:
+            self._pending.pop(job_id, None)
+
+    async def close(self):
+        if self.process.returncode is None:
+            self.process.kill()
+        await self.process.wait()
+
+# Node.js worker hosts by assignment directory, least recently used first
+node_hosts = collections.OrderedDict()
+node_hosts_lock = asyncio.Lock()
+
+async def get_node_host(assignment_dir, limits):
+    """Return the running worker host of an assignment, starting it if needed"""
+    if NODE_POOL_SIZE <= 0:
+        return None
+    
+    async with node_hosts_lock:
+        host = node_hosts.get(assignment_dir)
+        if host is None or not host.is_alive():
+            try:
+                host = await NodeWorkerHost.start(assignment_dir, NODE_POOL_SIZE, limits)
+            except Exception as e:
+                logger.warning(f"Could not start Node.js worker host: {str(e)}")
+                return None
+            node_hosts[assignment_dir] = host
+        node_hosts.move_to_end(assignment_dir)
+        host.last_used = time.monotonic()
+        
+        # Hosts still running jobs stay, even if that leaves more than MAX_NODE_HOSTS for a while
+        for other_dir, other in list(node_hosts.items())[:-1]:
+            if len(node_hosts) <= MAX_NODE_HOSTS:
+                break
+            if not other.is_busy():
+                del node_hosts[other_dir]
+                spawn_background(other.close())
+    return host
+
+async def discard_node_host(assignment_dir):
+    """Shut down the worker host of an assignment if it has one"""
+    host = node_hosts.pop(assignment_dir, None)
+    if host is not None:
+        await host.close()
+
+def evict_least_recently_used(entries, max_bytes):
+    """Delete the files of on-disk cache entries, oldest first, until the rest fit in max_bytes.
+    
+    entries are (last_used, size_bytes, paths) tuples; an entry's paths are deleted together.
+    """
+    total = sum(size for _, size, _ in entries)
+    for _, size, paths in sorted(entries):
+        if total <= max_bytes:
+            break
+        for path in paths:
+            with contextlib.suppress(OSError):
+                os.unlink(path)
+        total -= size
+
+class CppCompileCache:
+    """Size-bounded on-disk LRU of compiled binaries, keyed by a hash of everything that affects the build"""
+
+    def __init__(self, cache_dir, max_bytes):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        if self.enabled:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    @property
+    def enabled(self):
+        return self.max_bytes > 0
+
+    def key(self, code, compiler_version, flags):
+        payload = json.dumps([compiler_version, flags, code])
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def lookup(self, key):
+        """Return (binary_path, original_compile_time) for a cached build, or None"""
+        binary_path = os.path.join(self.cache_dir, key)
+        try:
+            with open(binary_path + ".json", "r") as f:
+                info = json.load(f)
+            # Touch the binary so it counts as recently used
+            os.utime(binary_path)
+        except (OSError, json.JSONDecodeError):
+            return None
+        return binary_path, info.get("compile_time", 0.0)
+
+    def store(self, key, binary_path, compile_time):
+        """Copy a freshly compiled binary into the cache and evict old entries if over budget"""
+        cached_path = os.path.join(self.cache_dir, key)
+        fd, temp_path = tempfile.mkstemp(dir=self.cache_dir, prefix=".tmp-")
+        os.close(fd)
+        try:
+            shutil.copy2(binary_path, temp_path)
+            with open(cached_path + ".json", "w") as f:
+                json.dump({"compile_time": compile_time}, f)
+            os.replace(temp_path, cached_path)
+        except OSError as e:
+            logger.warning(f"Could not cache compiled binary: {str(e)}")
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+            return
+        
+        self._evict()
+
+    def _evict(self):
+        with self._lock:
+            entries = []
+            for name in os.listdir(self.cache_dir):
+                if name.startswith(".") or name.endswith(".json"):
+                    continue
+                path = os.path.join(self.cache_dir, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, [path, path + ".json"]))
+            evict_least_recently_used(entries, self.max_bytes)
+
+cpp_compile_cache = CppCompileCache(CPP_CACHE_DIR, CPP_CACHE_MAX_BYTES)
+
+class ResultCache:
+    """In-memory LRU of execution results with a TTL, optionally backed by size-bounded JSON files on disk.
+    
+    Keys cover the assignment metadata, which gets a new environment_id whenever the environment
+    is rebuilt, so results from an old environment, requirements or limits are never reused.
+    """
+
+    def __init__(self, max_entries, ttl, disk_dir, disk_max_bytes):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.disk_dir = disk_dir
+        self.disk_max_bytes = disk_max_bytes
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.skipped = 0  # Runs not eligible for caching
+        self._entries = collections.OrderedDict()  # key -> (assignment_dir, expires_at, result)
+        self._in_flight = {}
+        if self.disk_enabled:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0 and self.ttl > 0
+
+    @property
+    def disk_enabled(self):
+        return self.enabled and self.disk_max_bytes > 0
+
+    def key(self, metadata, code, stdin):
+        payload = json.dumps([metadata, code, stdin], sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _disk_path(self, assignment_dir, key):
+        return os.path.join(self.disk_dir, os.path.basename(assignment_dir), key + ".json")
+
+    def lookup(self, assignment_dir, key):
+        """Return the cached result for key, or None"""
+        now = time.time()
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry[1] > now:
+                self._entries.move_to_end(key)
+                return entry[2]
+            del self._entries[key]
+        
+        if self.disk_enabled:
+            path = self._disk_path(assignment_dir, key)
+            try:
+                with open(path, "r") as f:
+                    cached = json.load(f)
+                if cached["expires_at"] > now:
+                    # Touch the file so it counts as recently used
+                    os.utime(path)
+                    self.disk_hits += 1
+                    self._remember(assignment_dir, key, cached["expires_at"], cached["result"])
+                    return cached["result"]
+            except (OSError, ValueError, KeyError):
+                pass
+        return None
+
+    def _remember(self, assignment_dir, key, expires_at, result):
+        self._entries[key] = (assignment_dir, expires_at, result)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def store(self, assignment_dir, key, result):
+        expires_at = time.time() + self.ttl
+        self._remember(assignment_dir, key, expires_at, result)
+        if not self.disk_enabled:
+            return
+        
+        path = self._disk_path(assignment_dir, key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with tempfile.NamedTemporaryFile("w", dir=os.path.dirname(path), suffix=".tmp", delete=False) as f:
+                json.dump({"expires_at": expires_at, "result": result}, f)
+            os.replace(f.name, path)
+        except OSError as e:
+            logger.warning(f"Could not cache execution result: {str(e)}")
+            return
+        self._evict()
+
+    def _evict(self):
+        entries = []
+        for root, _, names in os.walk(self.disk_dir):
+            for name in names:
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, [path]))
+        evict_least_recently_used(entries, self.disk_max_bytes)
+
+    def invalidate(self, assignment_dir):
+        """Forget every result of an assignment, e.g. when its environment is rebuilt or deleted"""
+        for key in [key for key, entry in self._entries.items() if entry[0] == assignment_dir]:
+            del self._entries[key]
+        # An empty name would be the whole disk cache
+        if self.disk_enabled and os.path.basename(assignment_dir):
+            shutil.rmtree(os.path.join(self.disk_dir, os.path.basename(assignment_dir)), ignore_errors=True)
+
+    async def get_or_run(self, assignment_dir, key, run):
+        """Return (result, hit): the cached result for key, or that of run(), shared by identical concurrent runs"""
+        result = self.lookup(assignment_dir, key)
+        if result is not None:
+            self.hits += 1
+            return result, True
+        
+        pending = self._in_flight.get(key)
+        if pending is not None:
+            result = await asyncio.shield(pending)
+            if result is not None:
+                self.hits += 1
+                return result, True
+        
+        self.misses += 1
+        pending = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = pending
+        result = None
+        try:
+            result = await run()
+        finally:
+            if self._in_flight.get(key) is pending:
+                del self._in_flight[key]
+            # Concurrent callers run the code themselves if this result can't be shared
+            cacheable = result is not None and is_cacheable_result(result)
+            pending.set_result(result if cacheable else None)
+        
+        if cacheable:
+            self.store(assignment_dir, key, result)
+        return result, False
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "disk_enabled": self.disk_enabled,
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "skipped": self.skipped,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0
+        }
+
+result_cache = ResultCache(RESULT_CACHE_SIZE, RESULT_CACHE_TTL_SECONDS, RESULT_CACHE_DIR, RESULT_CACHE_DISK_BYTES)
+
+def is_deterministic(language, code):
+    """Best-effort check that code uses nothing known to vary between runs (time, randomness, files, network)"""
+    pattern = NONDETERMINISTIC_PATTERNS.get(language)
+    return pattern is not None and not pattern.search(code)
+
+def is_cacheable_result(result):
+    """Runs that timed out or failed inside the API depend on load and are never reused"""
+    return not result.get("timed_out") and result.get("exit_code") is not None
+
+@functools.lru_cache(maxsize=None)
+def get_compiler_version(compiler):
+    """First line of the compiler's --version output, used to key cached binaries"""
+    try:
+        result = subprocess.run([compiler, "--version"], capture_output=True, text=True, timeout=10)
+        return result.stdout.splitlines()[0] if result.stdout else compiler
+    except (OSError, subprocess.TimeoutExpired):
+        return compiler
+
+@functools.lru_cache(maxsize=None)
+def get_runtime_version(language):
+    """Version of the interpreter environments of a language are built for, used to key shared environments"""
+    command = {"python": ["python", "--version"], "javascript": ["node", "--version"]}[language]
+    result = subprocess.run(command, capture_output=True, text=True, check=True, timeout=10)
+    return (result.stdout or result.stderr).strip()
+
+def remove_stale_scratch_dirs(entries, cutoff):
+    """Remove per-execution scratch directories last changed before cutoff, left behind by a crash or kill.
+    
+    Called at startup with the startup time, so executions that started since are left alone.
+    """
+    removed = 0
+    for _, entry in entries:
+        with contextlib.suppress(FileNotFoundError):
+            for scratch in os.scandir(os.path.join(entry.directory, "build")):
+                if scratch.name.startswith("run-") and scratch.is_dir(follow_symlinks=False) and scratch.stat().st_mtime < cutoff:
+                    shutil.rmtree(scratch.path, ignore_errors=True)
+                    removed += 1
+    if removed:
+        logger.info(f"Removed {removed} scratch directories left behind by interrupted executions")
+
+async def discard_execution_pools(assignment_dir):
+    """Shut down pre-started interpreters and workers, e.g. before the environment changes"""
+    await discard_python_pool(assignment_dir)
+    await discard_node_host(assignment_dir)
+
+@app.on_event("startup")
+async def load_assignments():
+    """Read every assignment's metadata once, so executions don't have to, and reconcile the catalog"""
+    assignment_registry.load()
+    entries = assignment_registry.list()
+    for name in set(VENV_TEMPLATES_PREBUILD) & set(VENV_TEMPLATES):
+        spawn_background(run_in_threadpool(venv_templates.get, name))
+    # Before any request can link a new assignment to an environment the prune would consider orphaned
+    await run_in_threadpool(environment_store.prune, [name for name, _ in entries])
+    spawn_background(run_in_threadpool(remove_stale_scratch_dirs, entries, time.time()))
+    # Measuring new environments can take a while, the catalog catches up in the background
+    spawn_background(run_in_threadpool(assignment_catalog.sync, entries))
+
+@app.on_event("startup")
+async def start_job_workers():
+    """Resume the durable job queue left over from a previous run"""
+    job_store.recover(JOB_RETENTION_SECONDS)
+    for _ in range(JOB_WORKERS):
+        job_workers.append(spawn_background(run_job_worker()))
+    jobs_available.set()
+
+pool_sweepers = []
+
+async def evict_idle_pools():
+    """Periodically shut down pre-started interpreters and worker hosts of assignments nobody has run in a while"""
+    while True:
+        await asyncio.sleep(POOL_SWEEP_INTERVAL_SECONDS)
+        now = time.monotonic()
+        for assignment_dir, pool in list(python_pools.items()):
+            if now - pool.last_used >= PYTHON_POOL_IDLE_SECONDS:
+                await discard_python_pool(assignment_dir)
+        for assignment_dir, host in list(node_hosts.items()):
+            if now - host.last_used >= NODE_HOST_IDLE_SECONDS and not host.is_busy() and node_hosts.get(assignment_dir) is host:
+                await discard_node_host(assignment_dir)
+
+@app.on_event("startup")
+async def start_pool_sweeper():
+    """Start evicting idle interpreter pools and worker hosts"""
+    pool_sweepers.append(spawn_background(evict_idle_pools()))
+
+@app.on_event("shutdown")
+async def shutdown_pools():
+    """Kill pre-started interpreters and workers so they don't outlive the server"""
+    # Jobs interrupted here are still marked running and get requeued on the next start
+    for worker in job_workers:
+        worker.cancel()
+    for sweeper in pool_sweepers:
+        sweeper.cancel()
+    
+    for assignment_dir in set(python_pools) | set(node_hosts):
+        await discard_execution_pools(assignment_dir)
+    
+    # Let interpreters still being started notice the closed pools and exit
+    await asyncio.gather(*background_tasks, return_exceptions=True)
+    
+    if process_spawner is not None:
+        await process_spawner.close()
 
 @app.get("/")
 def read_root():
     return {"message": "Code Execution API is running"}
 
+@app.get("/stats/cache")
+def cache_stats():
+    """Hit and miss counters of the execution result cache"""
+    return {"result_cache": result_cache.stats()}
+
 @app.post("/create/assignment")
-def create_assignment(assignment_data: AssignmentCreate):
+async def create_assignment(assignment_data: AssignmentCreate):
     """Create a new environment for an assignment with specified requirements"""
+    # Before anything derives paths from the name
+    validate_assignment_name(assignment_data.assignment_name)
+    
+    # Stop pre-started interpreters and workers before their environment is replaced
+    assignment_dir = os.path.join(BASE_DIR, assignment_data.assignment_name)
+    await discard_execution_pools(assignment_dir)
+    result_cache.invalidate(assignment_dir)
+    
+    # Environment setup blocks on pip, npm and g++, so keep it off the event loop
+    try:
+        result = await run_in_threadpool(build_assignment, assignment_data)
+    finally:
+        entry = assignment_registry.reload(assignment_data.assignment_name)
+        await run_in_threadpool(assignment_catalog.update, assignment_data.assignment_name, entry)
+    
+    # Start interpreters and workers now so the first execution is already warm
+    metadata = entry.metadata or {}
+    limits = get_execution_limits(metadata)
+    if result["language"] == "python":
+        get_python_pool(assignment_dir, get_python_args(assignment_dir, metadata), limits)
+    elif result["language"] == "javascript":
+        await get_node_host(assignment_dir, limits)
+    
+    return result
+
+def validate_assignment_name(assignment_name):
+    """Reject names that are not alphanumeric with underscores, e.g. empty ones or ones with path separators"""
+    if not assignment_name.replace("_", "").isalnum():
+        raise HTTPException(status_code=400, detail="Assignment name must be alphanumeric with underscores")
+
+def build_assignment(assignment_data: AssignmentCreate):
+    """Create the assignment directory, metadata and language environment"""
     assignment_name = assignment_data.assignment_name
     language = assignment_data.language.lower()
     requirements = assignment_data.requirements
     
-    # Validate assignment name (alphanumeric with underscores)
-    if not assignment_name.replace("_", "").isalnum():
-        raise HTTPException(status_code=400, detail="Assignment name must be alphanumeric with underscores")
+    validate_assignment_name(assignment_name)
     
     # Check if assignment already exists
     assignment_dir = os.path.join(BASE_DIR, assignment_name)
+    previous_environment = None
     if os.path.exists(assignment_dir):
         # Delete the existing assignment directory before recreating
         logger.info(f"Assignment '{assignment_name}' already exists - deleting previous data")
         try:
+            with contextlib.suppress(OSError, ValueError):
+                with open(os.path.join(assignment_dir, "metadata.json"), "r") as f:
+                    previous_environment = json.load(f).get("shared_environment")
             shutil.rmtree(assignment_dir)
         except Exception as e:
             logger.error(f"Failed to delete existing assignment: {str(e)}")
@@ -79,6 +2245,7 @@ def create_assignment(assignment_data: AssignmentCreate):
         raise HTTPException(status_code=400, 
                            detail=f"Language '{language}' is not supported. Supported languages: python, javascript, cpp")
     
+    shared_environment = None
     try:
         # Create assignment directory
         os.makedirs(assignment_dir, exist_ok=True)
@@ -87,7 +2254,11 @@ def create_assignment(assignment_data: AssignmentCreate):
         metadata = {
             "language": language,
             "requirements": requirements,
-            "created_at": time.strftime("%Y-%m-%d %H:%M:%S")
+            "limits": assignment_data.limits.model_dump(),
+            "fast_start": assignment_data.fast_start,
+            "created_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+            # Changes with every rebuild, so cached results of the old environment are not reused
+            "environment_id": uuid.uuid4().hex
         }
         
         with open(os.path.join(assignment_dir, "metadata.json"), "w") as f:
@@ -95,23 +2266,37 @@ def create_assignment(assignment_data: AssignmentCreate):
         
         logger.info(f"Created directory for assignment: {assignment_name} with language: {language}")
         
-        # Language-specific setup
+        # Language-specific setup, shared with assignments that have the same requirements
+        environment = {"install_report": []}
         try:
-            if language == "python":
-                setup_python_environment(assignment_dir, requirements)
-            elif language == "javascript":
-                setup_javascript_environment(assignment_dir, requirements)
+            if language in EnvironmentStore.LINKS:
+                environment = environment_store.acquire(
+                    assignment_name, language, requirements,
+                    functools.partial(build_shared_environment, language, requirements)
+                )
+                shared_environment = environment["key"]
+                environment_store.link(shared_environment, assignment_dir, language)
             elif language == "cpp":
                 setup_cpp_environment(assignment_dir, requirements)
         except subprocess.CalledProcessError as e:
             logger.warning(f"Some requirements could not be installed: {str(e)}")
             # We'll continue with the assignment creation even if some requirements failed
+        install_report = environment["install_report"]
+        update_assignment_metadata(
+            assignment_dir,
+            shared_environment=shared_environment,
+            install_report=install_report,
+            **({"python_startup": environment["python_startup"]} if "python_startup" in environment else {})
+        )
+        if previous_environment and previous_environment != shared_environment:
+            environment_store.release(assignment_name, previous_environment)
         
         return {
             "message": f"Assignment '{assignment_name}' created successfully",
             "assignment_name": assignment_name,
             "language": language,
-            "requirements": requirements
+            "requirements": requirements,
+            "install_report": install_report
         }
     
     except Exception as e:
@@ -119,60 +2304,286 @@ def create_assignment(assignment_data: AssignmentCreate):
         # Clean up if there was an error
         if os.path.exists(assignment_dir):
             shutil.rmtree(assignment_dir)
+        for key in {shared_environment, previous_environment} - {None}:
+            environment_store.release(assignment_name, key)
         raise HTTPException(status_code=500, detail=f"Unexpected error: {str(e)}")
 
-def setup_python_environment(assignment_dir, requirements):
-    """Set up a Python virtual environment with specified requirements"""
-    # Create virtual environment
-    venv_dir = os.path.join(assignment_dir, "venv")
-    subprocess.run(["python", "-m", "venv", venv_dir], check=True)
-    logger.info(f"Created Python virtual environment at {venv_dir}")
+# Only one pip writes into the wheelhouse at a time
+wheelhouse_lock = threading.Lock()
+
+def fill_wheelhouse(requirements, python_path="python"):
+    """Download or build wheels for requirements and their dependencies into the wheelhouse, returning the new files"""
+    os.makedirs(WHEELHOUSE_DIR, exist_ok=True)
+    with wheelhouse_lock:
+        existing = set(os.listdir(WHEELHOUSE_DIR))
+        subprocess.run(
+            [python_path, "-m", "pip", "wheel", "--prefer-binary", "--disable-pip-version-check",
+             "--find-links", WHEELHOUSE_DIR, "--wheel-dir", WHEELHOUSE_DIR, *requirements],
+            stderr=subprocess.PIPE, text=True, check=True
+        )
+        return sorted(set(os.listdir(WHEELHOUSE_DIR)) - existing)
+
+def install_from_wheelhouse(pip_path, requirements, upgrade=False):
+    """Install requirements offline from the wheelhouse"""
+    subprocess.run(
+        [pip_path, "install", "--no-index", "--find-links", WHEELHOUSE_DIR, "--disable-pip-version-check",
+         *(["--upgrade"] if upgrade else []), *requirements],
+        stderr=subprocess.PIPE, text=True, check=True
+    )
+
+def list_wheelhouse_files():
+    """Wheels in the wheelhouse with their normalized package name, version and size"""
+    wheels = []
+    with contextlib.suppress(FileNotFoundError):
+        for entry in os.scandir(WHEELHOUSE_DIR):
+            if not entry.name.endswith(".whl"):
+                continue
+            name, version = entry.name.split("-")[:2]
+            wheels.append({
+                "name": requirement_name(name),
+                "version": version,
+                "file": entry.name,
+                "size_bytes": entry.stat().st_size
+            })
+    return sorted(wheels, key=lambda wheel: (wheel["name"], wheel["version"]))
+
+def relax_requirement(requirement, language):
+    """Requirement without its version constraint, or None if it has none"""
+    requirement = requirement.strip()
+    if language == "javascript":
+        relaxed = requirement_name(requirement, language)
+    else:
+        relaxed = re.split(r"[<>=!~;@ ]", requirement, maxsplit=1)[0]
+    return relaxed if relaxed != requirement else None
+
+def install_requirements(requirements, language, strict_install, degraded_install):
+    """Install all requirements in one installer run, then in batched degraded passes if that fails.
     
-    # Install requirements if any
-    if requirements:
-        if os.name == 'nt':  # Windows
-            pip_path = os.path.join(venv_dir, "Scripts", "pip")
-        else:  # Unix-like
-            pip_path = os.path.join(venv_dir, "bin", "pip")
+    strict_install and degraded_install run the installer once for a list of requirement specs
+    and return None on success or the installer's error output. Each degraded pass drops the
+    version constraint of the requirements the installer blamed, or leaves them out once they
+    have none. Returns {requirement: 'installed' | 'relaxed' | 'failed'}.
+    """
+    error = strict_install(list(requirements))
+    if error is None:
+        logger.info(f"Installed all {language} requirements: {requirements}")
+        return {req: "installed" for req in requirements}
+    logger.warning(f"Could not install all {language} requirements at once: {error.strip()[-2000:]}")
+    
+    statuses = {}
+    specs = {req: req for req in requirements}
+    relaxed = set()
+    for attempt in range(2 * len(requirements) + 1):
+        culprits = {
+            requirement_name(culprit, language)
+            for pattern in INSTALL_ERROR_PATTERNS[language]
+            for culprit in pattern.findall(error)
+        }
+        blamed = [req for req, spec in specs.items() if requirement_name(spec, language) in culprits]
+        if not blamed and attempt > 0:
+            # Nothing identifiable to blame: relax every constraint at once, then give up
+            blamed = [req for req in specs if req not in relaxed and relax_requirement(specs[req], language)]
+            if not blamed:
+                break
+        
+        for req in blamed:
+            spec = relax_requirement(specs[req], language) if req not in relaxed else None
+            if spec:
+                specs[req] = spec
+                relaxed.add(req)
+            else:
+                statuses[req] = "failed"
+                del specs[req]
+        if not specs:
+            break
         
-        # Upgrade pip first
+        error = degraded_install(list(specs.values()))
+        if error is None:
+            break
+        logger.warning(f"Degraded install of {list(specs.values())} failed: {error.strip()[-2000:]}")
+    
+    for req in specs:
+        statuses[req] = "failed" if error is not None else ("relaxed" if req in relaxed else "installed")
+    statuses = {req: statuses[req] for req in requirements}
+    failed_requirements = [req for req, status in statuses.items() if status == "failed"]
+    if failed_requirements:
+        logger.warning(f"Could not install some requirements: {failed_requirements}")
+    return statuses
+
+def requirement_provided(requirement, packages):
+    """Whether installed packages ({name: version}) already satisfy a requirement that is unpinned or pinned with =="""
+    name = requirement_name(requirement)
+    spec = normalize_requirement(requirement)[len(name):].strip()
+    return name in packages and spec in ("", f"=={packages[name]}")
+
+def list_python_packages(pip_path):
+    """Installed packages of a venv as {normalized name: version}"""
+    result = subprocess.run(
+        [pip_path, "list", "--format=json", "--disable-pip-version-check"],
+        capture_output=True, text=True, check=True
+    )
+    return {requirement_name(package["name"]): package["version"] for package in json.loads(result.stdout)}
+
+def setup_python_environment(assignment_dir, requirements, template=True):
+    """Set up a Python virtual environment with specified requirements.
+    
+    The venv is cloned from the base template providing most of the requirements, so only the
+    rest is installed. template=False creates it from scratch, as for the templates themselves.
+    """
+    venv_dir = os.path.join(assignment_dir, "venv")
+    packages = {}
+    cloned = False
+    if template:
+        try:
+            name, info = venv_templates.select(requirements)
+            method = venv_templates.clone(name, venv_dir)
+            packages = info["packages"]
+            cloned = True
+            logger.info(f"Cloned the {name} venv template to {venv_dir} ({method})")
+        except (OSError, ValueError, subprocess.CalledProcessError) as e:
+            logger.warning(f"Could not clone a venv template, creating the venv from scratch: {str(e)}")
+            shutil.rmtree(venv_dir, ignore_errors=True)
+    
+    # Create virtual environment
+    if not cloned:
+        subprocess.run(["python", "-m", "venv", venv_dir], check=True)
+        logger.info(f"Created Python virtual environment at {venv_dir}")
+    
+    if os.name == 'nt':  # Windows
+        pip_path = os.path.join(venv_dir, "Scripts", "pip")
+    else:  # Unix-like
+        pip_path = os.path.join(venv_dir, "bin", "pip")
+    python_path = get_python_path(assignment_dir)
+    
+    # Upgrade pip first, from the wheelhouse once it holds a pip wheel. Clones have the template's
+    # pip, templates always get an up-to-date one
+    if not cloned and (requirements or not template):
         try:
-            # Add --no-index flag if we need to work completely offline
-            subprocess.run([pip_path, "install", "--upgrade", "pip"], check=True)
+            if not any(wheel["name"] == "pip" for wheel in list_wheelhouse_files()):
+                fill_wheelhouse(["pip"], python_path)
+            install_from_wheelhouse(pip_path, ["pip"], upgrade=True)
         except subprocess.CalledProcessError as e:
             logger.warning(f"Could not upgrade pip, continuing with installation: {str(e)}")
-        
-        # Install each requirement with enhanced error handling
-        failed_requirements = []
-        for req in requirements:
+    
+    # Install requirements if any, except what the template already provides
+    statuses = {req: "installed" for req in requirements}
+    delta = [req for req in requirements if not requirement_provided(req, packages)]
+    if delta:
+        def strict_install(specs):
+            # Offline from the wheelhouse, adding missing requirements to it in one pip wheel run
             try:
-                # Try with hash verification
-                subprocess.run([pip_path, "install", "--prefer-binary", req], check=True)
-                logger.info(f"Successfully installed {req}")
+                install_from_wheelhouse(pip_path, specs)
+                return None
+            except subprocess.CalledProcessError:
+                pass
+            try:
+                fill_wheelhouse(specs, python_path)
+                install_from_wheelhouse(pip_path, specs)
+                return None
             except subprocess.CalledProcessError as e:
-                logger.warning(f"Failed strict install for {req}: {str(e)}")
-                try:
-                    # Try bypassing hash verification
-                    subprocess.run([pip_path, "install", "--prefer-binary", "--no-cache-dir", 
-                                   "--disable-pip-version-check", req], check=True)
-                    logger.info(f"Successfully installed {req} (hash check bypassed)")
-                except subprocess.CalledProcessError as e:
-                    # Fall back to package name without version
-                    if any(op in req for op in ["==", ">=", "<="]):
-                        package_name = req.split("==")[0].split(">=")[0].split("<=")[0]
-                        try:
-                            subprocess.run([pip_path, "install", "--prefer-binary", 
-                                          "--no-cache-dir", package_name], check=True)
-                            logger.info(f"Successfully installed {package_name} (without version constraint)")
-                        except subprocess.CalledProcessError:
-                            failed_requirements.append(req)
-                    else:
-                        failed_requirements.append(req)
+                return e.stderr or ""
         
-        if failed_requirements:
-            logger.warning(f"Could not install some requirements: {failed_requirements}")
-        else:
-            logger.info(f"Installed all Python requirements: {requirements}")
+        def degraded_install(specs):
+            # Straight from the index, bypassing pip's cache
+            result = subprocess.run(
+                [pip_path, "install", "--prefer-binary", "--no-cache-dir", "--disable-pip-version-check",
+                 "--find-links", WHEELHOUSE_DIR, *specs],
+                stderr=subprocess.PIPE, text=True
+            )
+            return result.stderr if result.returncode != 0 else None
+        
+        statuses.update(install_requirements(delta, "python", strict_install, degraded_install))
+    elif requirements:
+        logger.info(f"The venv template provides all Python requirements: {requirements}")
+    
+    install_report = []
+    if requirements:
+        try:
+            versions = list_python_packages(pip_path)
+        except (subprocess.CalledProcessError, ValueError) as e:
+            logger.warning(f"Could not list installed Python packages: {str(e)}")
+            versions = {}
+        install_report = [
+            {"requirement": req, "status": status, "version": versions.get(requirement_name(req))}
+            for req, status in statuses.items()
+        ]
+    
+    return install_report
+
+def build_shared_environment(language, requirements, environment_dir):
+    """Set up a shared environment's packages and return what to record about it"""
+    if language == "python":
+        return {
+            "install_report": setup_python_environment(environment_dir, requirements),
+            "python_startup": prepare_python_startup(environment_dir)
+        }
+    return {"install_report": setup_javascript_environment(environment_dir, requirements)}
+
+def update_assignment_metadata(assignment_dir, **fields):
+    """Add fields to an assignment's metadata.json, replacing the file atomically"""
+    metadata_path = os.path.join(assignment_dir, "metadata.json")
+    with open(metadata_path, "r") as f:
+        metadata = json.load(f)
+    metadata.update(fields)
+    with tempfile.NamedTemporaryFile("w", dir=assignment_dir, suffix=".tmp", delete=False) as f:
+        json.dump(metadata, f)
+    os.replace(f.name, metadata_path)
+
+def prepare_python_startup(assignment_dir):
+    """Byte-compile the venv's packages and time interpreter startup with and without the fast-start profile.
+    
+    Returns the python_startup metadata: site_packages, the fast-start flags that are safe for
+    this venv, whether compiling succeeded and the median startup of each profile in milliseconds.
+    """
+    python_path = get_python_path(assignment_dir)
+    startup = {"site_packages": [], "fast_flags": ["-I"], "compiled": False, "startup_ms": {}}
+    try:
+        result = subprocess.run(
+            [python_path, "-I", "-c", "import json, site; print(json.dumps(site.getsitepackages()))"],
+            capture_output=True, text=True, check=True, timeout=30
+        )
+        startup["site_packages"] = json.loads(result.stdout)
+        
+        # Missing .pyc files would otherwise be compiled by the first interpreters importing them
+        result = subprocess.run(
+            [python_path, "-m", "compileall", "-q", "-j", "0", *startup["site_packages"]],
+            capture_output=True, text=True, timeout=600
+        )
+        startup["compiled"] = result.returncode == 0
+        if result.returncode != 0:
+            logger.warning(f"Some packages could not be byte-compiled: {result.stdout[-500:]}")
+    except (OSError, ValueError, subprocess.SubprocessError) as e:
+        logger.warning(f"Could not prepare Python startup: {str(e)}")
+        return startup
+    
+    # Skipping site.py is only safe when nothing in site-packages relies on it
+    needs_site = False
+    for directory in startup["site_packages"]:
+        with contextlib.suppress(OSError):
+            for name in os.listdir(directory):
+                if name in ("sitecustomize.py", "usercustomize.py"):
+                    needs_site = True
+                # setuptools' distutils shim is the one .pth file submissions can do without
+                if name.endswith(".pth") and name != "distutils-precedence.pth":
+                    needs_site = True
+    if not needs_site:
+        startup["fast_flags"].append("-S")
+    
+    for profile in ("default", "fast"):
+        args = get_python_args(assignment_dir, {"fast_start": profile == "fast", "python_startup": startup})
+        timings = []
+        try:
+            for _ in range(PYTHON_STARTUP_BENCHMARK_RUNS):
+                start_time = time.perf_counter()
+                subprocess.run(args, input=source_payload("", ""), capture_output=True, check=True, timeout=30)
+                timings.append(time.perf_counter() - start_time)
+        except (OSError, subprocess.SubprocessError) as e:
+            logger.warning(f"Could not time {profile} Python startup: {str(e)}")
+            continue
+        startup["startup_ms"][profile] = round(statistics.median(timings) * 1000, 1)
+    
+    logger.info(f"Python startup in {assignment_dir}: {startup['startup_ms']} (fast flags {startup['fast_flags']})")
+    return startup
 
 def setup_javascript_environment(assignment_dir, requirements):
     """Set up a Node.js environment with specified npm packages"""
@@ -193,6 +2604,7 @@ def setup_javascript_environment(assignment_dir, requirements):
         json.dump(package_json, f, indent=2)
     
     # Install npm packages if any
+    install_report = []
     if requirements:
         # Package name mappings for common errors
         package_mappings = {
@@ -209,24 +2621,57 @@ def setup_javascript_environment(assignment_dir, requirements):
             else:
                 corrected_requirements.append(req)
         
-        # Install packages one by one with error handling
-        failed_packages = []
-        for package in corrected_requirements:
-            try:
-                # Use --no-fund and --no-audit to reduce network calls
-                # Use --prefer-offline to use cached packages when possible
-                cmd = ["npm", "install", "--prefer-offline", "--no-fund", "--no-audit", 
-                       "--prefix", assignment_dir, package]
-                subprocess.run(cmd, check=True)
-                logger.info(f"Successfully installed {package}")
-            except subprocess.CalledProcessError as e:
-                logger.warning(f"Failed to install {package}: {str(e)}")
-                failed_packages.append(package)
+        # The same packages were installed before: link their files, or reinstall from the recorded lockfile
+        key = node_package_store.key(corrected_requirements)
+        manifest = node_package_store.manifest(key)
+        if manifest is not None:
+            if node_package_store.link_tree(manifest, assignment_dir):
+                logger.info(f"Linked JavaScript packages from the package store: {corrected_requirements}")
+                return manifest["install_report"]
+            if "package-lock.json" in manifest:
+                result = subprocess.run(
+                    ["npm", "ci", "--prefer-offline", "--no-fund", "--no-audit", "--prefix", assignment_dir],
+                    stderr=subprocess.PIPE, text=True
+                )
+                if result.returncode == 0:
+                    add_to_package_store(key, assignment_dir, manifest["install_report"])
+                    logger.info(f"Reinstalled JavaScript packages from their lockfile: {corrected_requirements}")
+                    return manifest["install_report"]
+                logger.warning(f"Could not reinstall from the recorded lockfile: {result.stderr.strip()[-2000:]}")
         
-        if failed_packages:
-            logger.warning(f"Could not install some packages: {failed_packages}")
-        else:
-            logger.info(f"Installed all JavaScript packages: {corrected_requirements}")
+        def npm_install(specs, *flags):
+            # Use --no-fund and --no-audit to reduce network calls
+            result = subprocess.run(
+                ["npm", "install", *flags, "--no-fund", "--no-audit", "--prefix", assignment_dir, *specs],
+                stderr=subprocess.PIPE, text=True
+            )
+            return result.stderr if result.returncode != 0 else None
+        
+        # Use cached packages when possible, and fresh registry metadata once that fails
+        statuses = install_requirements(
+            corrected_requirements, "javascript",
+            lambda specs: npm_install(specs, "--prefer-offline"),
+            lambda specs: npm_install(specs, "--prefer-online")
+        )
+        for req, status in statuses.items():
+            version = None
+            with contextlib.suppress(OSError, ValueError):
+                with open(os.path.join(pkg_dir, requirement_name(req, "javascript"), "package.json")) as f:
+                    version = json.load(f).get("version")
+            install_report.append({"requirement": req, "status": status, "version": version})
+        
+        # Only complete installs are worth repeating
+        if all(status == "installed" for status in statuses.values()):
+            add_to_package_store(key, assignment_dir, install_report)
+    
+    return install_report
+
+def add_to_package_store(key, assignment_dir, install_report):
+    """Hardlink an installed node_modules into the package store; the environment works without it too"""
+    try:
+        node_package_store.add_tree(key, assignment_dir, install_report)
+    except OSError as e:
+        logger.warning(f"Could not add node_modules to the package store: {str(e)}")
 
 def setup_cpp_environment(assignment_dir, requirements):
     """Set up a C++ environment (minimal setup as requirements handling would be complex)"""
@@ -251,40 +2696,207 @@ add_executable(program src/main.cpp)
     with open(os.path.join(assignment_dir, "CMakeLists.txt"), "w") as f:
         f.write(cmake_content)
     
+    # Precompile the common standard headers so submissions don't parse them every time
+    try:
+        build_cpp_pch()
+    except (subprocess.CalledProcessError, subprocess.TimeoutExpired, OSError) as e:
+        logger.warning(f"Could not build precompiled header, compiling without it: {str(e)}")
+    
     logger.info(f"Created C++ environment with CMake configuration")
 
+@functools.lru_cache(maxsize=None)
+def get_cpp_pch_key():
+    """Hash of the compiler version, flags and headers the precompiled header is built from"""
+    return hashlib.sha256(json.dumps(
+        [get_compiler_version(CPP_COMPILER), CPP_FLAGS, CPP_PCH_HEADERS]
+    ).encode()).hexdigest()[:16]
+
+def get_cpp_pch_header():
+    """Path of the shared header whose precompiled .gch sits next to it"""
+    return os.path.join(CPP_PCH_DIR, get_cpp_pch_key(), CPP_PCH_NAME)
+
+cpp_pch_lock = threading.Lock()
+
+def build_cpp_pch():
+    """Write the standard header set and precompile it with the flags used for submissions, unless already built"""
+    header = get_cpp_pch_header()
+    with cpp_pch_lock:
+        if os.path.exists(header + ".gch"):
+            return
+        
+        start_time = time.time()
+        os.makedirs(os.path.dirname(header), exist_ok=True)
+        with tempfile.NamedTemporaryFile("w", dir=os.path.dirname(header), delete=False) as f:
+            f.write("".join(f"#include <{name}>\n" for name in CPP_PCH_HEADERS))
+        os.chmod(f.name, 0o644)
+        os.replace(f.name, header)
+        
+        # Compiled under a temporary name so other workers never pick up a partial .gch
+        temp_path = f"{header}.{os.getpid()}.gch"
+        try:
+            subprocess.run(
+                [CPP_COMPILER, *CPP_FLAGS, "-x", "c++-header", header, "-o", temp_path],
+                check=True,
+                capture_output=True,
+                text=True,
+                timeout=120
+            )
+            os.replace(temp_path, header + ".gch")
+        finally:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(temp_path)
+        logger.info(f"Built precompiled header for {len(CPP_PCH_HEADERS)} standard headers in {time.time() - start_time:.2f}s")
+
+def cpp_pch_covers(code):
+    """Check that the code only includes precompiled standard headers, with no other directive before them"""
+    other_directive_seen = False
+    for line in code.splitlines():
+        stripped = line.strip()
+        if not stripped.startswith("#"):
+            continue
+        
+        match = CPP_INCLUDE_PATTERN.match(stripped)
+        if match is None:
+            # e.g. a #define that could change how a later header is parsed
+            other_directive_seen = True
+        elif other_directive_seen or match.group(1) != "<" or match.group(2).strip() not in CPP_PCH_HEADERS:
+            return False
+    return True
+
 @app.post("/execute/code", response_model=ExecutionResult)
-def execute_code(execution_data: CodeExecution):
+async def execute_code(execution_data: CodeExecution):
     """Execute code in the specified assignment environment"""
-    assignment_name = execution_data.assignment_name
-    code = execution_data.code
+    return await execute_assignment_code(
+        execution_data.assignment_name,
+        execution_data.code,
+        execution_data.stdin,
+        execution_data.stdin_cases
+    )
+
+# A registered assignment; error is set instead of metadata when its metadata.json can't be read
+AssignmentEntry = collections.namedtuple("AssignmentEntry", ["directory", "metadata", "error", "signature", "checked_at"])
+
+class AssignmentRegistry:
+    """Process-wide cache of assignment metadata, updated by create and delete.
     
-    # Check if assignment exists
-    assignment_dir = os.path.join(BASE_DIR, assignment_name)
-    if not os.path.exists(assignment_dir):
+    Entries are checked against metadata.json's mtime at most every check_interval seconds,
+    so assignments changed or removed outside the API are still noticed.
+    """
+
+    def __init__(self, base_dir, check_interval):
+        self.base_dir = base_dir
+        self.check_interval = check_interval
+        self._entries = {}
+        self._listed_at = None
+        self._lock = threading.Lock()
+
+    def load(self):
+        """Read the metadata of every assignment on disk"""
+        with self._lock:
+            self._entries.clear()
+            self._listed_at = None
+        self.list()
+
+    def reload(self, name):
+        """Check an assignment on disk now, returning its entry or None if it doesn't exist"""
+        if not name or name in (".", "..") or os.sep in name:
+            return None
+        
+        assignment_dir = os.path.join(self.base_dir, name)
+        metadata_path = os.path.join(assignment_dir, "metadata.json")
+        try:
+            stat = os.stat(metadata_path)
+            signature = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+        except FileNotFoundError:
+            if not os.path.isdir(assignment_dir):
+                self.forget(name)
+                return None
+            signature = None
+        
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is not None and signature is not None and entry.signature == signature:
+                entry = self._entries[name] = entry._replace(checked_at=time.monotonic())
+                return entry
+        
+        metadata, error = None, None
+        try:
+            with open(metadata_path, "r") as f:
+                metadata = json.load(f)
+        except (OSError, ValueError) as e:
+            error = e
+        entry = AssignmentEntry(assignment_dir, metadata, error, signature, time.monotonic())
+        with self._lock:
+            self._entries[name] = entry
+        return entry
+
+    def forget(self, name):
+        with self._lock:
+            self._entries.pop(name, None)
+
+    def get(self, name):
+        """Entry of an assignment, or None if it doesn't exist"""
+        entry = self._entries.get(name)
+        if entry is not None and time.monotonic() - entry.checked_at < self.check_interval:
+            return entry
+        return self.reload(name)
+
+    def list(self):
+        """(name, entry) of every assignment, looking for new and removed directories at most every check_interval"""
+        if self._listed_at is None or time.monotonic() - self._listed_at >= self.check_interval:
+            with os.scandir(self.base_dir) as entries:
+                names = {entry.name for entry in entries if entry.is_dir()}
+            with self._lock:
+                removed = set(self._entries) - names
+            for name in removed:
+                self.forget(name)
+            for name in names:
+                self.get(name)
+            self._listed_at = time.monotonic()
+        
+        with self._lock:
+            return sorted(self._entries.items())
+
+assignment_registry = AssignmentRegistry(BASE_DIR, ASSIGNMENT_CHECK_INTERVAL_SECONDS)
+
+def get_assignment_dir(assignment_name):
+    """Return the directory of an existing assignment, or raise a 404"""
+    entry = assignment_registry.get(assignment_name)
+    if entry is None:
+        raise HTTPException(status_code=404, detail=f"Assignment '{assignment_name}' not found")
+    return entry.directory
+
+def get_assignment_metadata(assignment_name):
+    """Registered metadata of an assignment, raising what reading its metadata.json raised if that failed"""
+    entry = assignment_registry.get(assignment_name)
+    if entry is None:
         raise HTTPException(status_code=404, detail=f"Assignment '{assignment_name}' not found")
+    if entry.error is not None:
+        raise entry.error.with_traceback(None)
+    return entry.metadata
+
+def load_assignment(assignment_name):
+    """Return (assignment_dir, metadata) for endpoints that fail the whole request on bad metadata"""
+    assignment_dir = get_assignment_dir(assignment_name)
+    try:
+        metadata = get_assignment_metadata(assignment_name)
+    except (OSError, json.JSONDecodeError) as e:
+        logger.error(f"Invalid assignment metadata: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Invalid assignment metadata: {str(e)}")
+    return assignment_dir, metadata
+
+async def execute_assignment_code(assignment_name, code, stdin="", stdin_cases=None):
+    """Look up the assignment's language and execute code in its environment"""
+    # Check if assignment exists
+    assignment_dir = get_assignment_dir(assignment_name)
     
     try:
-        # Read metadata to determine language
-        with open(os.path.join(assignment_dir, "metadata.json"), "r") as f:
-            metadata = json.load(f)
+        # Language and limits come from the registry, no need to read metadata.json
+        metadata = get_assignment_metadata(assignment_name)
         
-        language = metadata.get("language", "python")  # Default to python if not specified
-        
-        # Execute code based on language
-        if language == "python":
-            return execute_python_code(assignment_dir, code)
-        elif language == "javascript":
-            return execute_javascript_code(assignment_dir, code)
-        elif language == "cpp":
-            return execute_cpp_code(assignment_dir, code)
-        else:
-            logger.error(f"Unsupported language: {language}")
-            return {
-                "output": "",
-                "error": f"Unsupported language: {language}",
-                "execution_time": 0.0
-            }
+        if stdin_cases is not None:
+            return await run_execution_cases(assignment_dir, metadata, code, stdin_cases)
+        return await run_execution(assignment_dir, metadata, code, stdin)
     
     except FileNotFoundError as e:
         logger.error(f"Assignment metadata not found: {str(e)}")
@@ -310,61 +2922,528 @@ def execute_code(execution_data: CodeExecution):
             "execution_time": 0.0
         }
 
-def execute_python_code(assignment_dir, code):
-    """Execute Python code in a virtual environment"""
-    temp_file_path = None
+@app.post("/execute/batch")
+async def execute_batch(batch_data: BatchExecution):
+    """Run many submissions for one assignment, streaming each result (one JSON line) as it finishes"""
+    # Read metadata once for the whole batch
+    assignment_dir, metadata = load_assignment(batch_data.assignment_name)
+    
+    async def run_item(item):
+        try:
+            result = await run_execution(assignment_dir, metadata, item.code, item.stdin)
+        except Exception as e:
+            logger.error(f"Error executing batch item {item.id}: {str(e)}")
+            result = {"output": "", "error": f"Execution error: {str(e)}", "execution_time": 0.0}
+        return BatchItemResult(id=item.id, **result)
+    
+    async def stream_results():
+        # The execution limiter bounds how many of these actually run at once
+        tasks = [asyncio.ensure_future(run_item(item)) for item in batch_data.items]
+        try:
+            for finished in asyncio.as_completed(tasks):
+                item_result = await finished
+                yield item_result.model_dump_json() + "\n"
+        finally:
+            # Stop the remaining items if the client goes away
+            for task in tasks:
+                task.cancel()
+    
+    return StreamingResponse(stream_results(), media_type="application/x-ndjson")
+
+@app.post("/execute/stream")
+async def execute_stream(execution_data: CodeExecution):
+    """Execute code and stream its output as Server-Sent Events while it runs.
+    
+    Sends 'stdout' and 'stderr' events ({"data": chunk}) as output is produced, then one
+    'exit' event carrying the ExecutionResult (exit code, timing and the full output).
+    """
+    assignment_dir, metadata = load_assignment(execution_data.assignment_name)
+    events = asyncio.Queue()
+    
+    def on_output(stream_name, text):
+        events.put_nowait((stream_name, {"data": text}))
+    
+    async def run():
+        try:
+            result = await run_execution(assignment_dir, metadata, execution_data.code, execution_data.stdin, on_output)
+        except Exception as e:
+            logger.error(f"Error executing code: {str(e)}")
+            result = {"output": "", "error": f"Execution error: {str(e)}", "execution_time": 0.0}
+        events.put_nowait(("exit", ExecutionResult(**result).model_dump()))
+    
+    async def stream_events():
+        task = asyncio.ensure_future(run())
+        try:
+            while True:
+                event, payload = await events.get()
+                yield f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+                if event == "exit":
+                    break
+        finally:
+            # Stop the execution if the client goes away
+            task.cancel()
+    
+    return StreamingResponse(stream_events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+@app.post("/jobs", response_model=JobStatus)
+async def submit_job(job_data: JobSubmission):
+    """Queue code for execution and return immediately with a job id to poll"""
+    get_assignment_dir(job_data.assignment_name)
+    
+    job_id = job_store.submit(job_data.assignment_name, job_data.code)
+    jobs_available.set()
+    return job_store.get(job_id)
+
+@app.get("/jobs/{job_id}", response_model=JobStatus)
+async def get_job(job_id: str, wait: float = 0.0):
+    """Get a job's status and result, optionally waiting up to `wait` seconds for it to finish"""
+    job = job_store.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job '{job_id}' not found")
+    
+    wait = min(max(wait, 0.0), JOB_MAX_WAIT_SECONDS)
+    if wait > 0 and job["status"] in ("queued", "running"):
+        finished = job_finished_events.setdefault(job_id, asyncio.Event())
+        try:
+            await asyncio.wait_for(finished.wait(), wait)
+        except asyncio.TimeoutError:
+            pass
+        job = job_store.get(job_id)
+    
+    return job
+
+def get_test_cases_path(assignment_name):
+    return os.path.join(TEST_CASES_DIR, f"{assignment_name}.json")
+
+def load_test_cases(assignment_name):
+    """Registered test cases of an assignment, empty if it has none"""
     try:
-        # Create a temporary file for the code
-        with tempfile.NamedTemporaryFile(suffix='.py', mode='w', delete=False) as temp_file:
-            temp_file_path = temp_file.name
-            temp_file.write(code)
-        
-        # Get path to Python interpreter in the virtual environment
-        if os.name == 'nt':  # Windows
-            python_path = os.path.join(assignment_dir, "venv", "Scripts", "python.exe")
-        else:  # Unix-like
-            python_path = os.path.join(assignment_dir, "venv", "bin", "python")
-        
-        # Execute the code with the virtual environment's Python
-        start_time = time.time()
-        result = subprocess.run(
-            [python_path, temp_file_path],
-            capture_output=True,
-            text=True,
-            timeout=30  # Timeout after 30 seconds
+        with open(get_test_cases_path(assignment_name), "r") as f:
+            return [TestCase(**case) for case in json.load(f)]
+    except FileNotFoundError:
+        return []
+
+def save_test_cases(assignment_name, test_cases):
+    """Replace the test cases of an assignment"""
+    path = get_test_cases_path(assignment_name)
+    with tempfile.NamedTemporaryFile("w", dir=TEST_CASES_DIR, suffix=".tmp", delete=False) as f:
+        json.dump([case.model_dump() for case in test_cases], f)
+    os.replace(f.name, path)
+
+class OutputComparator:
+    """Compares program output with a test case's expected output incrementally as it is produced.
+    
+    feed() takes the output chunk by chunk and returns True at the first difference,
+    which is then kept in mismatch as a 1-based (line, column) of the program's output.
+    finish() checks that nothing expected is missing once the output is complete.
+    """
+
+    def __init__(self, expected_output, comparison):
+        self.comparison = comparison
+        self.expected = expected_output
+        if comparison == "trim":
+            self.expected = [line.rstrip() for line in expected_output.rstrip().split("\n")] if expected_output.strip() else []
+        elif comparison == "tokens":
+            self.expected = expected_output.split()
+        self.mismatch = None
+        self.line = 1
+        self.column = 1
+        self._matched = 0  # Characters, lines or tokens of the expected output matched so far
+        self._pending = ""  # Unfinished line or token
+        self._pending_start = (1, 1)
+
+    def on_output(self, stream_name, text):
+        """on_output callback of communicate_with_timeout, stopping the run at the first difference"""
+        return stream_name == "stdout" and self.feed(text)
+
+    def feed(self, text):
+        if self.mismatch is None:
+            if self.comparison == "exact":
+                self._feed_exact(text)
+            elif self.comparison == "tokens":
+                self._feed_tokens(text)
+            else:
+                self._feed_lines(text)
+        return self.mismatch is not None
+
+    def finish(self):
+        """Check the end of the output, returning True if it differs from the expected output"""
+        if self.mismatch is None:
+            if self.comparison == "trim":
+                if self._pending and not self._check_line(self._pending, True):
+                    self._matched += 1
+                    self.line += 1
+            elif self.comparison == "tokens":
+                self._check_token(True)
+            if self.mismatch is None and self._matched < len(self.expected):
+                self.mismatch = (self.line, self.column)
+        return self.mismatch is not None
+
+    def _advance(self, text):
+        newlines = text.count("\n")
+        if newlines:
+            self.line += newlines
+            self.column = len(text) - text.rfind("\n")
+        else:
+            self.column += len(text)
+
+    def _feed_exact(self, text):
+        expected = self.expected[self._matched:self._matched + len(text)]
+        common = len(os.path.commonprefix([text, expected]))
+        self._advance(text[:common])
+        self._matched += common
+        if common < len(text):
+            self.mismatch = (self.line, self.column)
+
+    def _feed_lines(self, text):
+        *lines, rest = text.split("\n")
+        for line in lines:
+            if self._check_line(self._pending + line, True):
+                return
+            self._pending = ""
+            self._matched += 1
+            self.line += 1
+        self._pending += rest
+        self._check_line(self._pending, False)
+
+    def _check_line(self, line, complete):
+        """Compare the current output line, which may still be growing, with its expected line"""
+        if self._matched >= len(self.expected):
+            # Only blank lines may follow the expected output
+            stripped = line.lstrip()
+            if stripped:
+                self.mismatch = (self.line, len(line) - len(stripped) + 1)
+            return self.mismatch is not None
+        
+        expected = self.expected[self._matched]
+        common = len(os.path.commonprefix([line, expected]))
+        if complete:
+            differs = line.rstrip() != expected
+        else:
+            differs = common < min(len(line), len(expected)) or bool(line[len(expected):].strip())
+            if not differs and len(line) > len(expected):
+                # Trailing whitespace still matches, don't keep all of it
+                self._pending = line[:len(expected) + 1]
+        if differs:
+            self.mismatch = (self.line, common + 1)
+        return differs
+
+    def _feed_tokens(self, text):
+        for piece in re.split(r"(\s+)", text):
+            if not piece:
+                continue
+            if piece[0].isspace():
+                if self._check_token(True):
+                    return
+            else:
+                if not self._pending:
+                    self._pending_start = (self.line, self.column)
+                self._pending += piece
+                if self._check_token(False):
+                    return
+            self._advance(piece)
+
+    def _check_token(self, complete):
+        """Compare the current output token, which may still be growing, with its expected token"""
+        if not self._pending:
+            return False
+        line, column = self._pending_start
+        if self._matched >= len(self.expected):
+            self.mismatch = (line, column)
+            return True
+        
+        expected = self.expected[self._matched]
+        if self._pending == expected if complete else expected.startswith(self._pending):
+            if complete:
+                self._matched += 1
+                self._pending = ""
+            return False
+        self.mismatch = (line, column + len(os.path.commonprefix([self._pending, expected])))
+        return True
+
+def case_verdict(result, test_case, comparator=None):
+    """Verdict of one test case run, with the comparator that saw its output if it was compared while streaming"""
+    if comparator is not None and comparator.mismatch is not None:
+        return "wrong_answer", comparator
+    if result.get("timed_out"):
+        return "timeout", comparator
+    if result.get("output_limit_exceeded"):
+        return "output_limit_exceeded", comparator
+    if result.get("exit_code") != 0:
+        return "runtime_error", comparator
+    if comparator is None:
+        comparator = OutputComparator(test_case.expected_output, test_case.comparison)
+        comparator.feed(result["output"])
+    if comparator.finish():
+        return "wrong_answer", comparator
+    return "pass", comparator
+
+@app.post("/create/testcases")
+async def create_test_cases(upload: TestCaseUpload):
+    """Register the test cases of an assignment, replacing any existing ones"""
+    get_assignment_dir(upload.assignment_name)
+    try:
+        save_test_cases(upload.assignment_name, upload.test_cases)
+    except OSError as e:
+        logger.error(f"Error saving test cases: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to save test cases: {str(e)}")
+    return {
+        "message": f"Registered {len(upload.test_cases)} test cases for '{upload.assignment_name}'",
+        "count": len(upload.test_cases)
+    }
+
+@app.get("/list/testcases/{assignment_name}", response_model=List[TestCaseInfo])
+def list_test_cases(assignment_name: str):
+    """List the test cases of an assignment, without the input and expected output of hidden ones"""
+    get_assignment_dir(assignment_name)
+    return [
+        TestCaseInfo(
+            name=test_case.name or f"case_{index + 1}",
+            hidden=test_case.hidden,
+            comparison=test_case.comparison,
+            weight=test_case.weight,
+            **({} if test_case.hidden else {"input": test_case.input, "expected_output": test_case.expected_output})
         )
-        execution_time = time.time() - start_time
+        for index, test_case in enumerate(load_test_cases(assignment_name))
+    ]
+
+@app.delete("/delete/testcases/{assignment_name}")
+def delete_test_cases(assignment_name: str):
+    """Remove all test cases of an assignment"""
+    try:
+        os.unlink(get_test_cases_path(assignment_name))
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail=f"Assignment '{assignment_name}' has no test cases")
+    return {"message": f"Test cases of '{assignment_name}' deleted successfully"}
+
+@app.post("/grade", response_model=GradeResult)
+async def grade_submission(submission: GradeSubmission):
+    """Run code against every test case of its assignment in parallel and score it"""
+    assignment_dir, metadata = load_assignment(submission.assignment_name)
+    test_cases = load_test_cases(submission.assignment_name)
+    if not test_cases:
+        raise HTTPException(status_code=400, detail=f"Assignment '{submission.assignment_name}' has no test cases")
+    
+    comparators = [None] * len(test_cases)
+    if submission.stop_on_mismatch:
+        comparators = [OutputComparator(case.expected_output, case.comparison) for case in test_cases]
+    
+    # Compiles once, then runs the cases side by side as execution slots allow
+    result = await run_execution_cases(
+        assignment_dir,
+        metadata,
+        submission.code,
+        [case.input for case in test_cases],
+        [comparator.on_output if comparator else None for comparator in comparators]
+    )
+    case_results = result.get("cases")
+    compile_error = None
+    if case_results is None:
+        compile_error = result["error"]
+        case_results = [{"output": "", "error": compile_error, "execution_time": 0.0}] * len(test_cases)
+    
+    verdicts = []
+    for index, (test_case, case_result, comparator) in enumerate(zip(test_cases, case_results, comparators)):
+        error = case_result["error"]
+        if comparator is not None and comparator.mismatch is not None:
+            # Found while the case was running, which was stopped right there
+            error += "\nExecution stopped at the first difference from the expected output\n"
         
-        # Collect output and error
-        output = result.stdout
-        error = result.stderr
+        if compile_error is not None:
+            verdict, comparator = "compile_error", None
+        else:
+            verdict, comparator = case_verdict(case_result, test_case, comparator)
+        mismatch = comparator.mismatch if verdict == "wrong_answer" else None
+        details = {} if test_case.hidden else {
+            "mismatch_line": mismatch and mismatch[0],
+            "mismatch_column": mismatch and mismatch[1],
+            "input": test_case.input,
+            "expected_output": test_case.expected_output,
+            "output": case_result["output"],
+            "error": error
+        }
+        verdicts.append(CaseVerdict(
+            name=test_case.name or f"case_{index + 1}",
+            hidden=test_case.hidden,
+            verdict=verdict,
+            weight=test_case.weight,
+            execution_time=case_result["execution_time"],
+            **details
+        ))
+    
+    return GradeResult(
+        assignment_name=submission.assignment_name,
+        score=sum(v.weight for v in verdicts if v.verdict == "pass"),
+        max_score=sum(v.weight for v in verdicts),
+        passed=sum(1 for v in verdicts if v.verdict == "pass"),
+        total=len(verdicts),
+        execution_time=result["execution_time"],
+        compile_error=compile_error,
+        cases=verdicts
+    )
+
+async def run_job_worker():
+    """Execute queued jobs one at a time until the server stops"""
+    while True:
+        job = job_store.claim_next()
+        if job is None:
+            jobs_available.clear()
+            await jobs_available.wait()
+            continue
         
-        # Clean up the temporary file
-        if temp_file_path and os.path.exists(temp_file_path):
-            os.unlink(temp_file_path)
+        try:
+            result = await execute_assignment_code(job["assignment_name"], job["code"])
+            job_store.finish(job["job_id"], "completed", result)
+        except HTTPException as e:
+            job_store.finish(job["job_id"], "failed", {"output": "", "error": e.detail, "execution_time": 0.0})
+        except Exception as e:
+            logger.error(f"Job {job['job_id']} failed: {str(e)}")
+            job_store.finish(job["job_id"], "failed", {"output": "", "error": f"Execution error: {str(e)}", "execution_time": 0.0})
         
+        finished = job_finished_events.pop(job["job_id"], None)
+        if finished is not None:
+            finished.set()
+
+async def run_execution(assignment_dir, metadata, code, stdin="", on_output=None):
+    """Run the code, reusing the result of an identical earlier run if the program is deterministic"""
+    language = metadata.get("language", "python")  # Default to python if not specified
+    assignment_catalog.touch(os.path.basename(assignment_dir))
+    # Streamed runs need their output live, so they always execute
+    if on_output is not None or not result_cache.enabled or not is_deterministic(language, code):
+        if result_cache.enabled:
+            result_cache.skipped += 1
+        return await run_execution_uncached(assignment_dir, metadata, code, stdin, on_output)
+    
+    result, hit = await result_cache.get_or_run(
+        assignment_dir,
+        result_cache.key(metadata, code, stdin),
+        lambda: run_execution_uncached(assignment_dir, metadata, code, stdin)
+    )
+    if hit:
+        # Nothing compiled or ran this time, so the original run's timings only say what was saved
         return {
-            "output": output,
-            "error": error,
-            "execution_time": round(execution_time, 3)
+            **result,
+            "result_cache": "hit",
+            "execution_time": 0.0,
+            "queue_time": 0.0,
+            "warm_start": False,
+            "compile_cache": None,
+            "compile_time_saved": 0.0,
+            "cpu_time_user": None,
+            "cpu_time_system": None,
+            "result_time_saved": result.get("execution_time", 0.0)
+        }
+    return {**result, "result_cache": "miss"}
+
+async def run_execution_uncached(assignment_dir, metadata, code, stdin="", on_output=None):
+    """Wait for an execution slot, then run the code with the executor for its language"""
+    language = metadata.get("language", "python")  # Default to python if not specified
+    limits = get_execution_limits(metadata)
+    if language not in LANGUAGE_CONCURRENCY:
+        logger.error(f"Unsupported language: {language}")
+        return {
+            "output": "",
+            "error": f"Unsupported language: {language}",
+            "execution_time": 0.0
         }
     
-    except subprocess.TimeoutExpired:
-        # Clean up the temporary file if it exists
-        if temp_file_path and os.path.exists(temp_file_path):
-            os.unlink(temp_file_path)
+    queue_start = time.time()
+    async with execution_limiter.slot(language):
+        queue_time = time.time() - queue_start
+        
+        # Execute code based on language
+        if language == "python":
+            python_args = get_python_args(assignment_dir, metadata)
+            result = await execute_python_code(assignment_dir, code, stdin, on_output, limits, python_args)
+        elif language == "javascript":
+            result = await execute_javascript_code(assignment_dir, code, stdin, on_output, limits)
+        else:
+            result = await execute_cpp_code(assignment_dir, code, stdin, on_output, limits)
+    
+    result["queue_time"] = round(queue_time, 3)
+    return result
+
+async def run_execution_cases(assignment_dir, metadata, code, stdin_cases, case_outputs=None):
+    """Run the code once per input, preparing it only once, and collect the per-input results.
+    
+    case_outputs optionally holds an on_output callback for each input.
+    """
+    language = metadata.get("language", "python")  # Default to python if not specified
+    case_outputs = case_outputs or [None] * len(stdin_cases)
+    if language == "cpp":
+        assignment_catalog.touch(os.path.basename(assignment_dir))
+        return await execute_cpp_cases(assignment_dir, code, stdin_cases, get_execution_limits(metadata), case_outputs)
+    
+    # Interpreted code has nothing to build; each input gets its own pre-started interpreter or worker
+    start_time = time.time()
+    cases = await asyncio.gather(*(
+        run_execution(assignment_dir, metadata, code, stdin, on_output)
+        for stdin, on_output in zip(stdin_cases, case_outputs)
+    ))
+    return {
+        "output": "",
+        "error": "",
+        "execution_time": round(time.time() - start_time, 3),
+        "cases": cases
+    }
+
+def get_python_args(assignment_dir, metadata):
+    """Command starting the submission bootstrap in an assignment's venv, in the fast-start profile if it opted in"""
+    python_path = get_python_path(assignment_dir)
+    startup = metadata.get("python_startup")
+    if not metadata.get("fast_start") or not startup:
+        return [python_path, "-c", PYTHON_POOL_BOOTSTRAP]
+    
+    bootstrap = PYTHON_POOL_BOOTSTRAP
+    if "-S" in startup["fast_flags"]:
+        bootstrap = PYTHON_FAST_START_PRELUDE.format(site_packages=startup["site_packages"]) + bootstrap
+    return [python_path, *startup["fast_flags"], "-c", bootstrap]
+
+def get_python_path(assignment_dir):
+    """Get the path to the Python interpreter in the assignment's virtual environment"""
+    if os.name == 'nt':  # Windows
+        return os.path.join(assignment_dir, "venv", "Scripts", "python.exe")
+    else:  # Unix-like
+        return os.path.join(assignment_dir, "venv", "bin", "python")
+
+async def execute_python_code(assignment_dir, code, stdin="", on_output=None, limits=None, python_args=None):
+    """Execute Python code in a virtual environment"""
+    python_args = python_args or get_python_args(assignment_dir, {})
+    limits = limits or get_execution_limits({})
+    
+    # Prefer an interpreter that is already started and waiting for code
+    pool = get_python_pool(assignment_dir, python_args, limits)
+    process = pool.acquire() if pool else None
+    if process is not None:
+        return await execute_python_code_warm(process, code, stdin, on_output, limits)
+    
+    try:
+        # The source goes in through stdin ahead of the program's input, nothing is written to disk
+        start_time = time.time()
+        result = await run_process(
+            python_args,
+            timeout=limits.run_timeout,
+            input_data=source_payload(code, stdin),
+            on_output=on_output,
+            limits=limits
+        )
+        execution_time = time.time() - start_time
         
+        return {
+            **process_result_fields(result, limits),
+            "execution_time": round(execution_time, 3),
+            "warm_start": False
+        }
+    
+    except asyncio.TimeoutError:
         return {
             "output": "",
-            "error": "Execution timed out after 30 seconds",
-            "execution_time": 30.0
+            "error": f"Execution timed out after {limits.run_timeout:g} seconds",
+            "execution_time": limits.run_timeout,
+            "timed_out": True
         }
     
     except Exception as e:
-        # Clean up the temporary file if it exists
-        if temp_file_path and os.path.exists(temp_file_path):
-            os.unlink(temp_file_path)
-        
         logger.error(f"Python execution error: {str(e)}")
         return {
             "output": "",
@@ -372,75 +3451,138 @@ def execute_python_code(assignment_dir, code):
             "execution_time": 0.0
         }
 
-def execute_javascript_code(assignment_dir, code):
-    """Execute JavaScript code using Node.js"""
-    temp_file_path = None
+async def execute_python_code_warm(process, code, stdin="", on_output=None, limits=None):
+    """Execute Python code in a pre-started interpreter from the pool"""
+    # The bootstrap reads exactly the source, everything after it is the program's stdin
+    payload = source_payload(code, stdin)
     try:
-        # Create a temporary file for the code
-        with tempfile.NamedTemporaryFile(suffix='.js', mode='w', delete=False) as temp_file:
-            temp_file_path = temp_file.name
-            temp_file.write(code)
+        start_time = time.time()
+        result = await communicate_with_timeout(process, payload, limits.run_timeout, on_output, limits.output_limit_bytes)
+        execution_time = time.time() - start_time
+        
+        return {
+            **process_result_fields(result, limits),
+            "execution_time": round(execution_time, 3),
+            "warm_start": True
+        }
+    
+    except asyncio.TimeoutError:
+        return {
+            "output": "",
+            "error": f"Execution timed out after {limits.run_timeout:g} seconds",
+            "execution_time": limits.run_timeout,
+            "timed_out": True,
+            "warm_start": True
+        }
+    
+    except Exception as e:
+        if process.returncode is None:
+            process.kill()
+            await process.wait()
+        logger.error(f"Python execution error: {str(e)}")
+        return {
+            "output": "",
+            "error": f"Python execution error: {str(e)}",
+            "execution_time": 0.0,
+            "warm_start": True
+        }
+
+def get_node_env(assignment_dir):
+    """Build the environment for Node.js with NODE_PATH including the assignment's node_modules"""
+    env = os.environ.copy()
+    node_modules_path = os.path.join(assignment_dir, "node_modules")
+    
+    # Handle NODE_PATH differently based on OS
+    if os.name == 'nt':  # Windows
+        path_separator = ";"
+    else:  # Unix-like
+        path_separator = ":"
+        
+    if "NODE_PATH" in env:
+        env["NODE_PATH"] = f"{node_modules_path}{path_separator}{env['NODE_PATH']}"
+    else:
+        env["NODE_PATH"] = node_modules_path
+    
+    logger.info(f"Setting NODE_PATH to: {env['NODE_PATH']}")
+    return env
+
+async def execute_javascript_code(assignment_dir, code, stdin="", on_output=None, limits=None):
+    """Execute JavaScript code using Node.js"""
+    limits = limits or get_execution_limits({})
+    
+    # Prefer the assignment's long-lived worker host, fall back to a fresh node process
+    host = await get_node_host(assignment_dir, limits)
+    if host is not None:
+        try:
+            result = await host.run(code, stdin, limits, on_output)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Node.js worker host failed: {str(e)}")
+            result = None
         
+        if result is not None:
+            if result["timedOut"]:
+                return {
+                    "output": "",
+                    "error": f"JavaScript execution timed out after {limits.run_timeout:g} seconds",
+                    "execution_time": limits.run_timeout,
+                    "timed_out": True,
+                    "warm_start": True
+                }
+            
+            error = result["stderr"]
+            if result["outputLimitExceeded"]:
+                error += output_limit_message(limits.output_limit_bytes)
+            if result["cpuLimitExceeded"]:
+                error += cpu_limit_message(limits)
+            return {
+                "output": result["stdout"],
+                "error": error,
+                "timed_out": result["cpuLimitExceeded"],
+                "execution_time": round(result["executionTime"], 3),
+                "warm_start": True,
+                "exit_code": result["exitCode"],
+                "output_truncated": result["truncated"],
+                "output_limit_exceeded": result["outputLimitExceeded"],
+                "cpu_time_user": result["cpuUser"],
+                "cpu_time_system": result["cpuSystem"],
+                "peak_memory_kb": result["heapKb"]
+            }
+        
+        await discard_node_host(assignment_dir)
+    
+    try:
         # Execute the code with Node.js
         start_time = time.time()
         
         # Set NODE_PATH to include the assignment's node_modules
-        env = os.environ.copy()
-        node_modules_path = os.path.join(assignment_dir, "node_modules")
-        
-        # Handle NODE_PATH differently based on OS
-        if os.name == 'nt':  # Windows
-            path_separator = ";"
-        else:  # Unix-like
-            path_separator = ":"
-            
-        if "NODE_PATH" in env:
-            env["NODE_PATH"] = f"{node_modules_path}{path_separator}{env['NODE_PATH']}"
-        else:
-            env["NODE_PATH"] = node_modules_path
+        env = get_node_env(assignment_dir)
         
-        logger.info(f"Setting NODE_PATH to: {env['NODE_PATH']}")
-        
-        result = subprocess.run(
-            ["node", temp_file_path],
-            capture_output=True,
-            text=True,
-            timeout=30,  # Timeout after 30 seconds
+        # The source goes in through stdin ahead of the program's input, nothing is written to disk
+        result = await run_process(
+            ["node", "-e", NODE_STDIN_BOOTSTRAP],
+            timeout=limits.run_timeout,
+            input_data=source_payload(code, stdin),
             env=env,
-            cwd=assignment_dir  # Run in the assignment directory to access local modules
+            cwd=assignment_dir,  # Run in the assignment directory to access local modules
+            on_output=on_output,
+            limits=limits
         )
         execution_time = time.time() - start_time
         
-        # Collect output and error
-        output = result.stdout
-        error = result.stderr
-        
-        # Clean up the temporary file
-        if temp_file_path and os.path.exists(temp_file_path):
-            os.unlink(temp_file_path)
-        
         return {
-            "output": output,
-            "error": error,
+            **process_result_fields(result, limits),
             "execution_time": round(execution_time, 3)
         }
     
-    except subprocess.TimeoutExpired:
-        # Clean up the temporary file if it exists
-        if temp_file_path and os.path.exists(temp_file_path):
-            os.unlink(temp_file_path)
-        
+    except asyncio.TimeoutError:
         return {
             "output": "",
-            "error": "JavaScript execution timed out after 30 seconds",
-            "execution_time": 30.0
+            "error": f"JavaScript execution timed out after {limits.run_timeout:g} seconds",
+            "execution_time": limits.run_timeout,
+            "timed_out": True
         }
     
     except Exception as e:
-        # Clean up the temporary file if it exists
-        if temp_file_path and os.path.exists(temp_file_path):
-            os.unlink(temp_file_path)
-        
         logger.error(f"JavaScript execution error: {str(e)}")
         return {
             "output": "",
@@ -448,65 +3590,188 @@ def execute_javascript_code(assignment_dir, code):
             "execution_time": 0.0
         }
 
-def execute_cpp_code(assignment_dir, code):
+def link_or_copy(src, dst):
+    """Hardlink src to dst, copying instead when they are on different filesystems"""
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
+async def compile_cpp_code(assignment_dir, code, scratch_dir, limits):
+    """Build code into scratch_dir, or link it from the compile cache.
+    
+    Returns (binary_path, info) with the compile_cache/compile_time_saved result fields,
+    or (None, error_result) when compilation fails.
+    """
+    start_time = time.time()
+    
+    # In Docker, we know g++ is installed
+    compiler = CPP_COMPILER
+    output_file = os.path.join(scratch_dir, "program")
+    if os.name == 'nt':  # Windows
+        output_file += ".exe"
+    
+    # Force-include the precompiled standard headers when they cover the code's includes
+    pch_header = get_cpp_pch_header()
+    use_pch = os.path.exists(pch_header + ".gch") and cpp_pch_covers(code)
+    pch_flags = ["-include", pch_header] if use_pch else []
+    
+    # Skip compilation entirely when this exact build is already cached
+    cache_key = None
+    cached = None
+    if cpp_compile_cache.enabled:
+        key_flags = CPP_FLAGS + (["-include", f"{CPP_PCH_NAME}:{get_cpp_pch_key()}"] if use_pch else [])
+        cache_key = cpp_compile_cache.key(code, get_compiler_version(compiler), key_flags)
+        cached = cpp_compile_cache.lookup(cache_key)
+    
+    if cached is not None:
+        # Link the cached binary in so eviction can't remove it while it runs
+        cached_path, compile_time_saved = cached
+        link_or_copy(cached_path, output_file)
+        return output_file, {"compile_cache": "hit", "compile_time_saved": round(compile_time_saved, 3)}
+    
+    # Write code to the source file
+    with open(os.path.join(scratch_dir, "main.cpp"), "w") as f:
+        f.write(code)
+    
+    # Compile the code (relative paths keep compiler messages short)
+    try:
+        compile_result = await run_process(
+            [compiler, *CPP_FLAGS, *pch_flags, "main.cpp", "-o", output_file],
+            timeout=limits.compile_timeout,
+            cwd=scratch_dir,
+            limits=compile_limits(limits)
+        )
+        if compile_result.returncode != 0 and use_pch:
+            # The extra standard headers can clash with the code's own names, retry without them
+            compile_result = await run_process(
+                [compiler, *CPP_FLAGS, "main.cpp", "-o", output_file],
+                timeout=limits.compile_timeout,
+                cwd=scratch_dir,
+                limits=compile_limits(limits)
+            )
+    except asyncio.TimeoutError:
+        return None, {
+            "output": "",
+            "error": f"C++ compilation timed out after {limits.compile_timeout:g} seconds",
+            "execution_time": round(time.time() - start_time, 3),
+            "compile_cache": "miss" if cache_key else None
+        }
+    compile_time = time.time() - start_time
+    
+    if compile_result.returncode != 0:
+        return None, {
+            "output": "",
+            "error": f"Compilation failed:\n{compile_result.stderr}",
+            "execution_time": round(compile_time, 3),
+            "compile_cache": "miss" if cache_key else None
+        }
+    
+    if cache_key:
+        cpp_compile_cache.store(cache_key, output_file, compile_time)
+    return output_file, {"compile_cache": "miss" if cache_key else None, "compile_time_saved": 0.0}
+
+async def run_cpp_program(binary_path, cwd, stdin="", on_output=None, limits=None):
+    """Run a compiled program once, returning the result fields of the run"""
+    try:
+        result = await run_process(
+            [binary_path],
+            timeout=limits.run_timeout,
+            input_data=stdin.encode("utf-8"),
+            cwd=cwd,
+            on_output=on_output,
+            limits=limits
+        )
+        return process_result_fields(result, limits)
+    
+    except asyncio.TimeoutError:
+        return {
+            "output": "",
+            "error": f"C++ execution timed out after {limits.run_timeout:g} seconds",
+            "execution_time": limits.run_timeout,
+            "timed_out": True
+        }
+
+async def execute_cpp_code(assignment_dir, code, stdin="", on_output=None, limits=None):
     """Execute C++ code by directly compiling with g++ or another compiler if available"""
+    limits = limits or get_execution_limits({})
+    # Every execution builds and runs in its own scratch directory so concurrent runs can't clash
+    build_root = os.path.join(assignment_dir, "build")
+    os.makedirs(build_root, exist_ok=True)
+    scratch_dir = tempfile.mkdtemp(prefix="run-", dir=build_root)
     try:
-        # Create source file
-        src_dir = os.path.join(assignment_dir, "src")
-        os.makedirs(src_dir, exist_ok=True)
-        
-        src_file = os.path.join(src_dir, "main.cpp")
-        
-        # Write code to the source file
-        with open(src_file, "w") as f:
-            f.write(code)
-        
         # Start timing
         start_time = time.time()
         
-        # In Docker, we know g++ is installed
-        compiler = "g++"
-        output_file = os.path.join(assignment_dir, "program")
-        if os.name == 'nt':  # Windows
-            output_file += ".exe"
-        
-        # Compile the code
-        compile_result = subprocess.run(
-            [compiler, "-std=c++17", src_file, "-o", output_file],
-            capture_output=True,
-            text=True,
-            timeout=30
-        )
-        
-        if compile_result.returncode != 0:
-            return {
-                "output": "",
-                "error": f"Compilation failed:\n{compile_result.stderr}",
-                "execution_time": round(time.time() - start_time, 3)
-            }
+        binary_path, compile_info = await compile_cpp_code(assignment_dir, code, scratch_dir, limits)
+        if binary_path is None:
+            return compile_info
         
         # Run the compiled program
-        run_result = subprocess.run(
-            [output_file],
-            capture_output=True,
-            text=True,
-            timeout=30,  # Timeout after 30 seconds
-            cwd=assignment_dir
-        )
+        result = await run_cpp_program(binary_path, scratch_dir, stdin, on_output, limits)
         
         execution_time = time.time() - start_time
         
+        # A timed out run reports the timeout as its execution time
         return {
-            "output": run_result.stdout,
-            "error": run_result.stderr,
-            "execution_time": round(execution_time, 3)
+            **compile_info,
+            "execution_time": round(execution_time, 3),
+            **result
         }
     
-    except subprocess.TimeoutExpired:
+    except Exception as e:
+        logger.error(f"C++ execution error: {str(e)}")
+        return {
+            "output": "",
+            "error": f"C++ execution error: {str(e)}",
+            "execution_time": 0.0
+        }
+    
+    finally:
+        shutil.rmtree(scratch_dir, ignore_errors=True)
+
+async def execute_cpp_cases(assignment_dir, code, stdin_cases, limits, case_outputs=None):
+    """Compile C++ code once, then run it against every input, in parallel as execution slots allow"""
+    build_root = os.path.join(assignment_dir, "build")
+    os.makedirs(build_root, exist_ok=True)
+    scratch_dir = tempfile.mkdtemp(prefix="run-", dir=build_root)
+    try:
+        start_time = time.time()
+        
+        queue_start = time.time()
+        async with execution_limiter.slot("cpp"):
+            queue_time = time.time() - queue_start
+            binary_path, compile_info = await compile_cpp_code(assignment_dir, code, scratch_dir, limits)
+        if binary_path is None:
+            return {**compile_info, "queue_time": round(queue_time, 3)}
+        
+        async def run_case(index, stdin, on_output):
+            # Separate working directories keep files written by parallel cases apart
+            case_dir = os.path.join(scratch_dir, f"case-{index}")
+            os.makedirs(case_dir)
+            case_queue_start = time.time()
+            async with execution_limiter.slot("cpp"):
+                case_queue_time = time.time() - case_queue_start
+                case_start = time.time()
+                result = await run_cpp_program(binary_path, case_dir, stdin, on_output, limits)
+            return {
+                "execution_time": round(time.time() - case_start, 3),
+                **result,
+                "queue_time": round(case_queue_time, 3)
+            }
+        
+        case_outputs = case_outputs or [None] * len(stdin_cases)
+        cases = await asyncio.gather(*(
+            run_case(index, stdin, on_output)
+            for index, (stdin, on_output) in enumerate(zip(stdin_cases, case_outputs))
+        ))
         return {
             "output": "",
-            "error": "C++ execution timed out after 30 seconds",
-            "execution_time": 30.0
+            "error": "",
+            "execution_time": round(time.time() - start_time, 3),
+            **compile_info,
+            "queue_time": round(queue_time, 3),
+            "cases": cases
         }
     
     except Exception as e:
@@ -516,62 +3781,95 @@ def execute_cpp_code(assignment_dir, code):
             "error": f"C++ execution error: {str(e)}",
             "execution_time": 0.0
         }
+    
+    finally:
+        shutil.rmtree(scratch_dir, ignore_errors=True)
 
 @app.delete("/delete/assignment/{assignment_name}")
-def delete_assignment(assignment_name: str):
+async def delete_assignment(assignment_name: str):
     """Delete an assignment environment"""
-    assignment_dir = os.path.join(BASE_DIR, assignment_name)
-    
-    if not os.path.exists(assignment_dir):
-        raise HTTPException(status_code=404, detail=f"Assignment '{assignment_name}' not found")
+    assignment_dir = get_assignment_dir(assignment_name)
     
     try:
-        # Remove the assignment directory
-        shutil.rmtree(assignment_dir)
+        # Remove the assignment directory and its test cases
+        await discard_execution_pools(assignment_dir)
+        result_cache.invalidate(assignment_dir)
+        entry = assignment_registry.get(assignment_name)
+        shared_environment = ((entry and entry.metadata) or {}).get("shared_environment")
+        await run_in_threadpool(shutil.rmtree, assignment_dir)
+        if shared_environment:
+            await run_in_threadpool(environment_store.release, assignment_name, shared_environment)
+        assignment_registry.forget(assignment_name)
+        assignment_catalog.remove(assignment_name)
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(get_test_cases_path(assignment_name))
         return {"message": f"Assignment '{assignment_name}' deleted successfully"}
     
     except Exception as e:
         logger.error(f"Error deleting assignment: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to delete assignment: {str(e)}")
 
+@app.post("/seed/wheelhouse")
+async def seed_wheelhouse(seed_data: WheelhouseSeed):
+    """Add wheels for popular packages to the shared wheelhouse so environments can install them offline"""
+    added = []
+    failed_requirements = []
+    for requirement in seed_data.requirements:
+        try:
+            added.extend(await run_in_threadpool(fill_wheelhouse, [requirement]))
+        except (OSError, subprocess.CalledProcessError) as e:
+            logger.warning(f"Could not add {requirement} to the wheelhouse: {str(e)}")
+            failed_requirements.append(requirement)
+    return {"added": added, "failed_requirements": failed_requirements}
+
+@app.get("/list/wheelhouse")
+def list_wheelhouse():
+    """List the wheels available for offline installs"""
+    wheels = list_wheelhouse_files()
+    return {"wheels": wheels, "total_bytes": sum(wheel["size_bytes"] for wheel in wheels)}
+
+@app.get("/list/environments")
+def list_environments():
+    """List the shared environments and the assignments linked to them"""
+    return {"environments": environment_store.list()}
+
 @app.get("/list/assignments")
-def list_assignments():
-    """List all available assignments with their languages"""
-    try:
-        assignments = []
-        
-        for name in os.listdir(BASE_DIR):
-            dir_path = os.path.join(BASE_DIR, name)
-            if os.path.isdir(dir_path):
-                # Try to get language from metadata
-                metadata_path = os.path.join(dir_path, "metadata.json")
-                if os.path.exists(metadata_path):
-                    try:
-                        with open(metadata_path, "r") as f:
-                            metadata = json.load(f)
-                            assignments.append({
-                                "name": name,
-                                "language": metadata.get("language", "unknown"),
-                                "created_at": metadata.get("created_at", "unknown")
-                            })
-                    except (json.JSONDecodeError, IOError):
-                        assignments.append({
-                            "name": name,
-                            "language": "unknown",
-                            "created_at": "unknown"
-                        })
-                else:
-                    assignments.append({
-                        "name": name,
-                        "language": "unknown",
-                        "created_at": "unknown"
-                    })
-        
-        return {"assignments": assignments}
+def list_assignments(
+    language: Optional[str] = None,
+    prefix: Optional[str] = None,
+    package: Optional[str] = None,
+    created_after: Optional[str] = None,
+    created_before: Optional[str] = None,
+    sort: Literal["name", "created_at", "last_used", "size"] = "name",
+    order: Literal["asc", "desc"] = "asc",
+    limit: int = CATALOG_PAGE_SIZE,
+    cursor: Optional[str] = None
+):
+    """List assignments from the catalog, one page at a time.
     
-    except Exception as e:
+    Filters by language, name prefix, required package and creation time ('YYYY-MM-DD HH:MM:SS'
+    or a prefix of it). Pass the returned next_cursor to get the following page.
+    """
+    limit = min(max(limit, 1), CATALOG_MAX_PAGE_SIZE)
+    try:
+        assignments, next_cursor = assignment_catalog.query(
+            language=language,
+            prefix=prefix,
+            package=package,
+            created_after=created_after,
+            created_before=created_before,
+            sort=sort,
+            descending=order == "desc",
+            limit=limit,
+            cursor=cursor
+        )
+    except (ValueError, TypeError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid cursor: {str(e)}")
+    except sqlite3.Error as e:
         logger.error(f"Error listing assignments: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to list assignments: {str(e)}")
+    
+    return {"assignments": assignments, "next_cursor": next_cursor}
 
 if __name__ == "__main__":
     import uvicorn
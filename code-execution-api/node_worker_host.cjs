@@ -0,0 +1,335 @@
+// node_worker_host.cjs
+// Long-lived Node.js process serving JavaScript executions for one assignment.
+// It keeps a few worker threads started and waiting; each submission runs in a
+// fresh worker (its own V8 isolate and event loop) that is thrown away afterwards.
+//
+// Usage: node node_worker_host.cjs <poolSize> <memoryLimitMb> <clockTicksPerSecond>
+//
+// Protocol (one JSON object per line):
+//   stdin:  {"id": 1, "code": "...", "stdin": "", "timeout": 30, "cpuLimit": 30,
+//            "stream": false, "outputCapture": 65536, "outputLimit": 16777216}
+//   stdout: {"id": 1, "type": "result", "stdout": "...", "stderr": "...", "exitCode": 0,
+//            "timedOut": false, "truncated": false, "outputLimitExceeded": false,
+//            "cpuLimitExceeded": false, "cpuUser": 0.01, "cpuSystem": 0, "heapKb": 4096,
+//            "executionTime": 0.012}
+// Each output stream keeps only its first and last outputCapture/2 bytes; the
+// worker is terminated once it writes more than outputLimit bytes (0 = no limit).
+// CPU time is that of the worker's own thread, read from /proc (Linux only);
+// the V8 heap limit of each worker is memoryLimitMb (0 = no limit).
+// With "stream": true, output chunks are also sent while the code runs:
+//           {"id": 1, "type": "output", "stream": "stdout", "data": "..."}
+// A running job is stopped early with {"id": 1, "cancel": true}; its result is
+// sent as for any other terminated worker.
+
+const { MessageChannel, Worker, receiveMessageOnPort } = require('worker_threads');
+const readline = require('readline');
+const path = require('path');
+const { StringDecoder } = require('string_decoder');
+
+const fs = require('fs');
+
+const poolSize = parseInt(process.argv[2] || '2', 10);
+const memoryLimitMb = parseInt(process.argv[3] || '0', 10);
+const clockTicks = parseInt(process.argv[4] || '100', 10);
+const assignmentDir = process.cwd();
+
+// Runs inside each worker: wait for the submission, then execute it as a
+// CommonJS main module located in the assignment directory. stdin is handed
+// over with the submission; an unread worker stdin pipe would keep the
+// worker alive until the timeout. Output is counted inside the worker too:
+// a busy loop never yields to flush its stdout to the host, so the host alone
+// could not stop it before the timeout. For the same reason streamed output is
+// posted on its own message port, which the host receives while the code runs
+const WORKER_BOOTSTRAP = `
+const { parentPort } = require('worker_threads');
+const { Readable } = require('stream');
+const Module = require('module');
+parentPort.once('message', ({ code, filename, stdin, outputLimit, limitFlag, usage, outputPort }) => {
+  parentPort.close();
+  // usage: [thread id, user ticks, system ticks, heap bytes, final]
+  const readStat = () => {
+    const stat = require('fs').readFileSync('/proc/thread-self/stat', 'utf8');
+    return [stat.slice(0, stat.indexOf(' '))].concat(stat.slice(stat.lastIndexOf(')') + 2).split(' '));
+  };
+  try {
+    usage[0] = Number(readStat()[0]);
+  } catch (err) {
+    // No per-thread accounting on this platform
+  }
+  process.on('exit', () => {
+    try {
+      const fields = readStat();
+      usage[1] = Number(fields[12]);
+      usage[2] = Number(fields[13]);
+    } catch (err) {
+      // No per-thread accounting on this platform
+    }
+    const heap = require('v8').getHeapStatistics();
+    usage[3] = heap.total_physical_size + heap.malloced_memory;
+    usage[4] = 1;
+  });
+  if (outputLimit || outputPort) {
+    let written = 0;
+    for (const [name, stream] of [['stdout', process.stdout], ['stderr', process.stderr]]) {
+      const write = stream.write;
+      stream.write = function (chunk, encoding, callback) {
+        const data = typeof chunk === 'string'
+          ? Buffer.from(chunk, typeof encoding === 'string' ? encoding : 'utf8')
+          : chunk;
+        written += data.length;
+        if (outputLimit && written > outputLimit) {
+          Atomics.store(limitFlag, 0, 1);
+          process.exit(1);
+        }
+        if (outputPort) {
+          outputPort.postMessage({ name, data });
+          const done = typeof encoding === 'function' ? encoding : callback;
+          if (done) process.nextTick(done);
+          return true;
+        }
+        return write.call(this, chunk, encoding, callback);
+      };
+    }
+  }
+  let stdinStream = null;
+  Object.defineProperty(process, 'stdin', {
+    configurable: true,
+    get: () => stdinStream || (stdinStream = Readable.from(stdin ? [Buffer.from(stdin)] : []))
+  });
+  const mod = new Module(filename, null);
+  mod.filename = filename;
+  mod.paths = Module._nodeModulePaths(require('path').dirname(filename));
+  process.mainModule = mod;
+  mod._compile(code, filename);
+});
+`;
+
+const idle = [];
+// Workers of the jobs currently running, by job id
+const running = new Map();
+
+function spawnWorker() {
+  return new Worker(WORKER_BOOTSTRAP, {
+    eval: true,
+    stdout: true,
+    stderr: true,
+    resourceLimits: memoryLimitMb > 0 ? { maxOldGenerationSizeMb: memoryLimitMb } : {}
+  });
+}
+
+// [user ticks, system ticks] of a running worker thread, or null once it is gone
+function threadCpuTicks(tid) {
+  try {
+    const stat = fs.readFileSync(`/proc/${process.pid}/task/${tid}/stat`, 'utf8');
+    const fields = stat.slice(stat.lastIndexOf(')') + 2).split(' ');
+    return [Number(fields[11]), Number(fields[12])];
+  } catch (err) {
+    return null;
+  }
+}
+
+function replenish() {
+  while (idle.length < poolSize) {
+    idle.push(spawnWorker());
+  }
+}
+
+// Head and tail of a stream within a fixed capacity, mirroring OutputBuffer in main.py
+class OutputBuffer {
+  constructor(capacity) {
+    this.headSize = Math.floor(capacity / 2);
+    this.tailSize = capacity - this.headSize;
+    this.head = [];
+    this.headLength = 0;
+    // Chunks covering at least the last tailSize bytes; copying the tail on every
+    // write would make a flood of small console.log chunks quadratic
+    this.tailChunks = [];
+    this.tailLength = 0;
+    this.total = 0;
+  }
+
+  write(chunk) {
+    this.total += chunk.length;
+    const room = this.headSize - this.headLength;
+    if (room > 0) {
+      const part = chunk.subarray(0, room);
+      this.head.push(part);
+      this.headLength += part.length;
+      chunk = chunk.subarray(room);
+    }
+    if (chunk.length > 0) {
+      this.tailChunks.push(chunk);
+      this.tailLength += chunk.length;
+      while (this.tailLength - this.tailChunks[0].length >= this.tailSize) {
+        this.tailLength -= this.tailChunks.shift().length;
+      }
+    }
+  }
+
+  get tail() {
+    const tail = Buffer.concat(this.tailChunks);
+    return tail.subarray(Math.max(0, tail.length - this.tailSize));
+  }
+
+  get truncated() {
+    return this.total > this.headLength + Math.min(this.tailLength, this.tailSize);
+  }
+
+  toString() {
+    const head = Buffer.concat(this.head);
+    const tail = this.tail;
+    if (!this.truncated) {
+      return Buffer.concat([head, tail]).toString('utf8');
+    }
+    const omitted = this.total - head.length - tail.length;
+    return head.toString('utf8') + `\n... [${omitted} bytes truncated] ...\n` + tail.toString('utf8');
+  }
+}
+
+function collect(stream, capacity, onData, onChunk) {
+  const buffer = new OutputBuffer(capacity);
+  const decoder = new StringDecoder('utf8');
+  const write = (chunk) => {
+    buffer.write(chunk);
+    onData();
+    if (onChunk) {
+      const text = decoder.write(chunk);
+      if (text) onChunk(text);
+    }
+  };
+  stream.on('data', write);
+  const done = new Promise((resolve) => stream.on('end', resolve));
+  return { buffer, write, done };
+}
+
+function send(message) {
+  process.stdout.write(JSON.stringify(message) + '\n');
+}
+
+function run(job) {
+  const worker = idle.length > 0 ? idle.shift() : spawnWorker();
+  setImmediate(replenish);
+  running.set(job.id, worker);
+
+  const forward = (name) => job.stream
+    ? (data) => send({ id: job.id, type: 'output', stream: name, data })
+    : null;
+  let outputLimitExceeded = false;
+  const checkOutputLimit = () => {
+    if (job.outputLimit && !outputLimitExceeded &&
+        stdout.buffer.total + stderr.buffer.total > job.outputLimit) {
+      outputLimitExceeded = true;
+      worker.terminate();
+    }
+  };
+  const capacity = job.outputCapture || 65536;
+  const stdout = collect(worker.stdout, capacity, checkOutputLimit, forward('stdout'));
+  const stderr = collect(worker.stderr, capacity, checkOutputLimit, forward('stderr'));
+  const errors = [];
+  let timedOut = false;
+
+  const exited = new Promise((resolve) => {
+    worker.on('error', (err) => errors.push(err));
+    worker.on('exit', resolve);
+  });
+
+  const timer = setTimeout(() => {
+    timedOut = true;
+    worker.terminate();
+  }, job.timeout * 1000);
+
+  // Set by the worker when it stops itself for exceeding the output limit
+  const limitFlag = new Int32Array(new SharedArrayBuffer(4));
+  // Filled in by the worker, see WORKER_BOOTSTRAP
+  const usage = new Float64Array(new SharedArrayBuffer(5 * 8));
+
+  // Sample the worker thread's CPU time; a worker stopped from here never reports its own
+  let cpuTicks = null;
+  let cpuLimitExceeded = false;
+  const cpuTimer = setInterval(() => {
+    const ticks = usage[0] ? threadCpuTicks(usage[0]) : null;
+    if (ticks === null) return;
+    cpuTicks = ticks;
+    if (job.cpuLimit && (ticks[0] + ticks[1]) / clockTicks >= job.cpuLimit && !cpuLimitExceeded) {
+      cpuLimitExceeded = true;
+      worker.terminate();
+    }
+  }, 100);
+
+  // Streamed output comes over a port of its own, see WORKER_BOOTSTRAP
+  const output = job.stream ? new MessageChannel() : null;
+  const receiveOutput = ({ name, data }) => {
+    (name === 'stdout' ? stdout : stderr).write(Buffer.from(data.buffer, data.byteOffset, data.byteLength));
+  };
+  if (output) {
+    output.port1.on('message', receiveOutput);
+  }
+
+  const start = process.hrtime.bigint();
+  worker.postMessage({
+    code: job.code,
+    filename: path.join(assignmentDir, 'main.js'),
+    stdin: job.stdin || '',
+    outputLimit: job.outputLimit,
+    limitFlag,
+    usage,
+    outputPort: output ? output.port2 : undefined
+  }, output ? [output.port2] : []);
+
+  Promise.all([exited, stdout.done, stderr.done]).then(([exitCode]) => {
+    clearTimeout(timer);
+    clearInterval(cpuTimer);
+    running.delete(job.id);
+    if (output) {
+      for (let message; (message = receiveMessageOnPort(output.port1));) {
+        receiveOutput(message.message);
+      }
+      output.port1.close();
+    }
+    if (Atomics.load(limitFlag, 0)) {
+      outputLimitExceeded = true;
+    }
+    if (usage[4]) {
+      cpuTicks = [usage[1], usage[2]];
+    }
+    const executionTime = Number(process.hrtime.bigint() - start) / 1e9;
+
+    let errorText = stderr.buffer.toString();
+    for (const err of errors) {
+      errorText += (err && err.stack ? err.stack : String(err)) + '\n';
+    }
+
+    send({
+      id: job.id,
+      type: 'result',
+      stdout: stdout.buffer.toString(),
+      stderr: errorText,
+      exitCode,
+      timedOut,
+      truncated: stdout.buffer.truncated || stderr.buffer.truncated || outputLimitExceeded,
+      outputLimitExceeded,
+      cpuLimitExceeded,
+      cpuUser: cpuTicks ? cpuTicks[0] / clockTicks : null,
+      cpuSystem: cpuTicks ? cpuTicks[1] / clockTicks : null,
+      heapKb: usage[4] ? Math.round(usage[3] / 1024) : null,
+      executionTime
+    });
+  });
+}
+
+replenish();
+
+const input = readline.createInterface({ input: process.stdin });
+input.on('line', (line) => {
+  if (!line.trim()) {
+    return;
+  }
+  const message = JSON.parse(line);
+  if (message.cancel) {
+    const worker = running.get(message.id);
+    if (worker) worker.terminate();
+  } else {
+    run(message);
+  }
+});
+input.on('close', () => process.exit(0));
@@ -0,0 +1,81 @@
+import os
+import sys
+import shutil
+import statistics
+import subprocess
+import tempfile
+import time
+
+# Import helpers from the API without starting the server
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import main
+
+# Same includes as test_execute_advanced_cpp_code in hard-test.py
+CODE = """
+#include <iostream>
+#include <vector>
+#include <algorithm>
+#include <queue>
+#include <map>
+#include <set>
+#include <string>
+#include <chrono>
+#include <random>
+#include <functional>
+#include <memory>
+#include <thread>
+#include <mutex>
+#include <future>
+
+int main() {
+    std::vector<int> values;
+    for (int i = 0; i < 1000; i++) values.push_back(i);
+    std::shuffle(values.begin(), values.end(), std::mt19937(42));
+    std::priority_queue<int> heap(values.begin(), values.end());
+    std::map<int, std::string> names{{1, "one"}, {2, "two"}};
+    auto total = std::async(std::launch::async, [&] { return heap.top() + (int)names.size(); });
+    std::cout << total.get() << std::endl;
+    return 0;
+}
+"""
+
+RUNS = 5
+
+def time_compile(src_file, output_file, extra_flags):
+    """Median wall time of compiling src_file RUNS times"""
+    timings = []
+    for _ in range(RUNS):
+        start_time = time.time()
+        subprocess.run(
+            [main.CPP_COMPILER, *main.CPP_FLAGS, *extra_flags, src_file, "-o", output_file],
+            check=True,
+            capture_output=True
+        )
+        timings.append(time.time() - start_time)
+    return statistics.median(timings)
+
+def main_benchmark():
+    """Compare compile times of the advanced C++ test program with and without the precompiled header"""
+    assignment_dir = tempfile.mkdtemp(prefix="pch-bench-")
+    try:
+        start_time = time.time()
+        main.setup_cpp_environment(assignment_dir, [])
+        print(f"Environment setup (incl. shared PCH build on first use): {time.time() - start_time:.3f}s")
+
+        src_file = os.path.join(assignment_dir, "src", "main.cpp")
+        with open(src_file, "w") as f:
+            f.write(CODE)
+        output_file = os.path.join(assignment_dir, "program")
+
+        print(f"Includes covered by PCH: {main.cpp_pch_covers(CODE)}")
+        without_pch = time_compile(src_file, output_file, [])
+        with_pch = time_compile(src_file, output_file, ["-include", main.get_cpp_pch_header()])
+
+        print(f"Compile without PCH: {without_pch:.3f}s (median of {RUNS})")
+        print(f"Compile with PCH:    {with_pch:.3f}s (median of {RUNS})")
+        print(f"Speedup: {without_pch / with_pch:.2f}x")
+    finally:
+        shutil.rmtree(assignment_dir)
+
+if __name__ == "__main__":
+    main_benchmark()
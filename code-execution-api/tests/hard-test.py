@@ -19,7 +19,9 @@ def test_create_advanced_python_assignment():
             "tensorflow>=2.16.0",  # Updated to use latest available TensorFlow version
             "transformers==4.37.0",
             "torch==2.1.2"
-        ]
+        ],
+        # Importing these libraries alone takes a while
+        "limits": {"run_timeout": 120}
     }
     
     response = requests.post(f"{BASE_URL}/create/assignment", json=assignment_data)
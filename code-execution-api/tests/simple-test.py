@@ -5,6 +5,18 @@ import json
 # Base URL for the API
 BASE_URL = "http://localhost:8000"
 
+def test_seed_wheelhouse():
+    """Test pre-seeding the shared wheelhouse used for offline installs"""
+    print("\n=== Testing Seed Wheelhouse ===")
+    
+    response = requests.post(f"{BASE_URL}/seed/wheelhouse", json={"requirements": ["six"]})
+    print(f"Status Code: {response.status_code}")
+    print(f"Response: {response.json()}")
+    
+    response = requests.get(f"{BASE_URL}/list/wheelhouse")
+    print(f"Status Code: {response.status_code}")
+    print(f"Wheels: {[wheel['file'] for wheel in response.json()['wheels']]}")
+
 def test_create_assignment():
     """Test creating a new assignment environment"""
     print("\n=== Testing Create Assignment ===")
@@ -227,6 +239,188 @@ int main() {
     print(f"Error: {result.get('error', '')}")
     print(f"Execution Time: {result.get('execution_time', '')} seconds")
 
+def test_submit_job(assignment_name):
+    """Test queueing code as a job and long-polling for its result"""
+    print("\n=== Testing Submit Job ===")
+    
+    job_data = {
+        "assignment_name": assignment_name,
+        "code": "print('Hello from the job queue')"
+    }
+    
+    response = requests.post(f"{BASE_URL}/jobs", json=job_data)
+    print(f"Status Code: {response.status_code}")
+    job = response.json()
+    print(f"Job: {job}")
+    
+    response = requests.get(f"{BASE_URL}/jobs/{job['job_id']}", params={"wait": 30})
+    print(f"Status Code: {response.status_code}")
+    job = response.json()
+    print(f"Status: {job.get('status', '')}")
+    print(f"Result: {job.get('result', '')}")
+
+def test_execute_batch(assignment_name):
+    """Test executing several submissions with stdin in one streamed batch"""
+    print("\n=== Testing Execute Batch ===")
+    
+    batch_data = {
+        "assignment_name": assignment_name,
+        "items": [
+            {"id": f"student_{i}", "code": "n = int(input())\nprint(n * n)", "stdin": f"{i}\n"}
+            for i in range(1, 4)
+        ]
+    }
+    
+    response = requests.post(f"{BASE_URL}/execute/batch", json=batch_data, stream=True)
+    print(f"Status Code: {response.status_code}")
+    for line in response.iter_lines():
+        if line:
+            result = json.loads(line)
+            print(f"{result['id']}: output={result.get('output', '')!r} error={result.get('error', '')!r}")
+
+def test_execute_stream(assignment_name):
+    """Test streaming output of running code as Server-Sent Events"""
+    print("\n=== Testing Execute Stream ===")
+    
+    execution_data = {
+        "assignment_name": assignment_name,
+        "code": "import time\nfor i in range(3):\n    print(i, flush=True)\n    time.sleep(0.5)"
+    }
+    
+    response = requests.post(f"{BASE_URL}/execute/stream", json=execution_data, stream=True)
+    print(f"Status Code: {response.status_code}")
+    event = None
+    for line in response.iter_lines(decode_unicode=True):
+        if line.startswith("event: "):
+            event = line[len("event: "):]
+        elif line.startswith("data: "):
+            print(f"{event}: {json.loads(line[len('data: '):])}")
+
+def test_execute_stdin_cases(assignment_name):
+    """Test compiling C++ code once and running it against several inputs"""
+    print("\n=== Testing Execute C++ Code with Several Inputs ===")
+    
+    execution_data = {
+        "assignment_name": assignment_name,
+        "code": "#include <iostream>\nint main() { long n; std::cin >> n; std::cout << n * n << std::endl; }",
+        "stdin_cases": ["2\n", "3\n", "4\n"]
+    }
+    
+    response = requests.post(f"{BASE_URL}/execute/code", json=execution_data)
+    print(f"Status Code: {response.status_code}")
+    result = response.json()
+    print(f"Compile cache: {result.get('compile_cache')}, total time: {result.get('execution_time')}")
+    for index, case in enumerate(result.get("cases") or []):
+        print(f"Case {index}: output={case['output']!r} time={case['execution_time']}")
+
+def test_grade_submission(assignment_name):
+    """Test registering test cases and grading a submission against them"""
+    print("\n=== Testing Grade Submission ===")
+    
+    test_case_data = {
+        "assignment_name": assignment_name,
+        "test_cases": [
+            {"name": "two", "input": "2\n", "expected_output": "4\n"},
+            {"name": "three", "input": "3\n", "expected_output": "9\n"},
+            {"name": "hidden", "input": "10\n", "expected_output": "100\n", "hidden": True, "weight": 2}
+        ]
+    }
+    response = requests.post(f"{BASE_URL}/create/testcases", json=test_case_data)
+    print(f"Status Code: {response.status_code}")
+    print(f"Response: {response.json()}")
+    
+    # Hidden cases are listed without their input and expected output
+    response = requests.get(f"{BASE_URL}/list/testcases/{assignment_name}")
+    print(f"Status Code: {response.status_code}")
+    for case in response.json():
+        print(f"{case['name']} (hidden: {case['hidden']}): input {case.get('input')!r}, expected {case.get('expected_output')!r}")
+    
+    grade_data = {
+        "assignment_name": assignment_name,
+        "code": "n = int(input())\nprint(n * n if n < 10 else n)"
+    }
+    response = requests.post(f"{BASE_URL}/grade", json=grade_data)
+    print(f"Status Code: {response.status_code}")
+    result = response.json()
+    print(f"Score: {result.get('score')}/{result.get('max_score')}")
+    for case in result.get("cases", []):
+        print(f"{case['name']}: {case['verdict']}")
+    
+    # Stop each case at its first wrong line instead of letting it print forever
+    grade_data["code"] = "n = int(input())\nwhile True:\n    print(n + 1)"
+    grade_data["stop_on_mismatch"] = True
+    response = requests.post(f"{BASE_URL}/grade", json=grade_data)
+    print(f"Status Code: {response.status_code}")
+    for case in response.json().get("cases", []):
+        print(f"{case['name']}: {case['verdict']} at line {case.get('mismatch_line')}, column {case.get('mismatch_column')} ({case['execution_time']}s)")
+    
+    # Without it the endless output runs into the output limit instead
+    grade_data["stop_on_mismatch"] = False
+    response = requests.post(f"{BASE_URL}/grade", json=grade_data)
+    print(f"Status Code: {response.status_code}")
+    for case in response.json().get("cases", []):
+        print(f"{case['name']}: {case['verdict']} (expected output_limit_exceeded)")
+
+def test_result_cache(assignment_name):
+    """Test that rerunning unchanged deterministic code is served from the result cache"""
+    print("\n=== Testing Result Cache ===")
+    
+    execution_data = {
+        "assignment_name": assignment_name,
+        "code": "n = int(input())\nprint(sum(i * i for i in range(n)))",
+        "stdin": "1000\n"
+    }
+    for _ in range(2):
+        response = requests.post(f"{BASE_URL}/execute/code", json=execution_data)
+        result = response.json()
+        print(f"Output: {result.get('output', '').strip()}, result cache: {result.get('result_cache')}, "
+              f"execution time: {result.get('execution_time')}s, saved: {result.get('result_time_saved')}s")
+    
+    response = requests.get(f"{BASE_URL}/stats/cache")
+    print(f"Status Code: {response.status_code}")
+    print(f"Response: {response.json()}")
+
+def test_fast_start_assignment():
+    """Test a Python assignment whose interpreters start in the fast-start profile"""
+    print("\n=== Testing Fast-Start Assignment ===")
+    
+    assignment_data = {
+        "assignment_name": "test_fast_start_assignment",
+        "language": "python",
+        "requirements": ["six"],
+        "fast_start": True
+    }
+    response = requests.post(f"{BASE_URL}/create/assignment", json=assignment_data)
+    print(f"Status Code: {response.status_code}")
+    
+    execution_data = {
+        "assignment_name": assignment_data["assignment_name"],
+        "code": "import sys, six\nprint(sys.flags.isolated, sys.flags.no_site, six.__name__)",
+        "stdin": ""
+    }
+    response = requests.post(f"{BASE_URL}/execute/code", json=execution_data)
+    print(f"Status Code: {response.status_code}")
+    print(f"Response: {response.json()}")
+
+def test_shared_environment():
+    """Test that assignments with the same requirements link to one shared environment"""
+    print("\n=== Testing Shared Environment ===")
+    
+    assignment_data = {
+        "assignment_name": "test_shared_environment",
+        "language": "python",
+        "requirements": ["pandas==2.1.4", "numpy==1.26.4"]
+    }
+    response = requests.post(f"{BASE_URL}/create/assignment", json=assignment_data)
+    print(f"Status Code: {response.status_code}")
+    
+    response = requests.get(f"{BASE_URL}/list/environments")
+    print(f"Status Code: {response.status_code}")
+    for environment in response.json()["environments"]:
+        print(f"{environment['key']}: {environment['requirements']} used by {environment['assignments']}")
+    
+    requests.delete(f"{BASE_URL}/delete/assignment/{assignment_data['assignment_name']}")
+
 def test_execute_nonexistent_assignment():
     """Test executing code for a nonexistent assignment"""
     print("\n=== Testing Execute Code for Nonexistent Assignment ===")
@@ -240,15 +434,36 @@ def test_execute_nonexistent_assignment():
     print(f"Status Code: {response.status_code}")
     print(f"Response: {response.json()}")
 
+def test_create_assignment_invalid_name():
+    """Test that invalid assignment names are rejected before anything is touched"""
+    print("\n=== Testing Create Assignment with Invalid Names ===")
+    
+    for assignment_name in ["", "x/", "../x"]:
+        assignment_data = {
+            "assignment_name": assignment_name,
+            "language": "python",
+            "requirements": []
+        }
+        response = requests.post(f"{BASE_URL}/create/assignment", json=assignment_data)
+        print(f"{assignment_name!r}: Status Code: {response.status_code} (expected 400)")
+
 def main():
     """Run all tests"""
     try:
         # Python tests
         print("\n\n========== PYTHON TESTS ==========")
+        test_seed_wheelhouse()
         assignment_name = test_create_assignment()
         time.sleep(1)
         test_execute_python_code(assignment_name)
         test_execute_code_with_error(assignment_name)
+        test_submit_job(assignment_name)
+        test_execute_batch(assignment_name)
+        test_execute_stream(assignment_name)
+        test_grade_submission(assignment_name)
+        test_result_cache(assignment_name)
+        test_fast_start_assignment()
+        test_shared_environment()
         
         # JavaScript tests
         print("\n\n========== JAVASCRIPT TESTS ==========")
@@ -262,10 +477,12 @@ def main():
         cpp_assignment_name = test_create_cpp_assignment()
         time.sleep(1)
         test_execute_cpp_code(cpp_assignment_name)
+        test_execute_stdin_cases(cpp_assignment_name)
         test_execute_cpp_code_with_error(cpp_assignment_name)
         
-        # Test nonexistent assignment
+        # Test nonexistent assignment and invalid names
         test_execute_nonexistent_assignment()
+        test_create_assignment_invalid_name()
         
     except requests.exceptions.ConnectionError:
         print("ERROR: Could not connect to the server. Make sure the API is running on http://localhost:8000")